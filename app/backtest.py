@@ -1,10 +1,16 @@
 import pandas as pd
 import numpy as np
+from typing import Optional
 
 from app.ml_engine import get_historical_predictions
 
 
-def run_backtest(market_data: pd.DataFrame, initial_capital: float = 10000.0) -> pd.DataFrame:
+def run_backtest(
+    market_data: pd.DataFrame,
+    initial_capital: float = 10000.0,
+    ticker: Optional[str] = None,
+    start: Optional[pd.Timestamp] = None
+) -> pd.DataFrame:
     # work on a copy so upstream data is untouched
     backtest = market_data.copy()
 
@@ -21,12 +27,16 @@ def run_backtest(market_data: pd.DataFrame, initial_capital: float = 10000.0) ->
     backtest["Base_Signal"] = base_signal
 
     try:
-        ml_score = get_historical_predictions(backtest)
+        ml_score = get_historical_predictions(backtest, ticker=ticker)
     except Exception:
         ml_score = 0.0
 
     backtest["ML_Score"] = ml_score
 
+    # predictions also see the warm-up rows ahead of the period; the strategy is only run from `start`
+    if start is not None:
+        backtest = backtest.loc[backtest.index >= start].copy()
+
     combined_signal = backtest["Base_Signal"] + (backtest["ML_Score"] * 0.2)
     backtest["Signal"] = combined_signal.clip(0.0, 1.2)
 
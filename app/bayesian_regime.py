@@ -1,86 +1,218 @@
+import hashlib
+import logging
+import os
+import pickle
+import threading
 import numpy as np
 import pandas as pd
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+
+from app.data import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+STATE_DIR = CACHE_DIR / "regime"
+
+
+REGIME_FACTORS = [
+    "macro_score",
+    "credit_stress_z",
+    "curve_slope",
+    "macro_liquidity_z",
+    "dollar_regime_z",
+]
+
+# each regime defined by how it "expects" each macro input to behave
+REGIME_TEMPLATES = {
+    "Expansion": {
+        "macro_score": (1.0, 0.8),
+        "credit_stress_z": (-0.5, 1.0),
+        "curve_slope": (1.0, 1.0),
+        "macro_liquidity_z": (-0.5, 1.0),
+        "dollar_regime_z": (-0.2, 1.0),
+    },
+    "Slowdown": {
+        "macro_score": (0.0, 0.7),
+        "credit_stress_z": (0.5, 1.0),
+        "curve_slope": (0.0, 1.0),
+        "macro_liquidity_z": (0.5, 1.0),
+        "dollar_regime_z": (0.5, 1.0),
+    },
+    "Stress": {
+        "macro_score": (-1.5, 0.8),
+        "credit_stress_z": (2.0, 1.2),
+        "curve_slope": (-1.0, 1.5),
+        "macro_liquidity_z": (1.5, 1.2),
+        "dollar_regime_z": (1.5, 1.2),
+    },
+}
+
+REGIME_NAMES = list(REGIME_TEMPLATES.keys())
+
+# weight kept on the previous posterior when forming the next prior
+PRIOR_PERSISTENCE = 0.9
+
+# factor digest -> regime frame, most recently used last
+REGIME_MEMO_SIZE = int(os.getenv("REGIME_MEMO_SIZE", "16"))
+
+_memo_lock = threading.Lock()
+_regime_memo: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+
+
+def _template_arrays():
+    means = np.array([[REGIME_TEMPLATES[r][f][0] for f in REGIME_FACTORS] for r in REGIME_NAMES])
+    stds = np.array([[REGIME_TEMPLATES[r][f][1] for f in REGIME_FACTORS] for r in REGIME_NAMES])
+    return means, np.maximum(stds, 1e-6)
+
+
+def _log_likelihoods(values: np.ndarray) -> np.ndarray:
+    # (rows x factors) -> (rows x regimes), summing independent gaussian log densities
+    means, stds = _template_arrays()
+    z = (values[:, None, :] - means[None, :, :]) / stds[None, :, :]
+    log_pdf = -0.5 * z ** 2 - np.log(stds)[None, :, :] - 0.5 * np.log(2 * np.pi)
+    return log_pdf.sum(axis=2)
+
+
+def _run_filter(log_likelihoods: np.ndarray, prior: np.ndarray):
+    n_regimes = log_likelihoods.shape[1]
+    path = np.empty_like(log_likelihoods)
+
+    # normalising against the row max keeps extreme rows from underflowing to zero
+    shifted = np.exp(log_likelihoods - log_likelihoods.max(axis=1, keepdims=True))
+
+    for i in range(len(shifted)):
+        posterior = prior * shifted[i]
+        posterior /= posterior.sum()
+        path[i] = posterior
+
+        # smooth transition so regimes don't flip unrealistically fast
+        prior = posterior * PRIOR_PERSISTENCE + (1 / n_regimes) * (1 - PRIOR_PERSISTENCE)
+
+    return path, prior
+
+
+def _regime_frame(path: np.ndarray, index: pd.Index) -> pd.DataFrame:
+    regime_df = pd.DataFrame(
+        path,
+        columns=[f"P_{name}" for name in REGIME_NAMES],
+        index=index
+    )
+
+    regime_df["Regime"] = regime_df.idxmax(axis=1).str.replace("P_", "")
+
+    return regime_df
+
+
+def _factor_digest(values: np.ndarray, index: pd.Index) -> str:
+    digest = hashlib.sha1()
+    digest.update(pd.util.hash_pandas_object(pd.Series(index), index=False).to_numpy().tobytes())
+    digest.update(np.ascontiguousarray(values).tobytes())
+    return digest.hexdigest()
 
 
-def _normal_pdf(x, mean, std):
-    std = max(std, 1e-6)
-    return np.exp(-0.5 * ((x - mean) / std) ** 2) / (std * np.sqrt(2 * np.pi))
+def _can_resume(state: Optional[Dict[str, Any]], values: np.ndarray, index: pd.Index) -> bool:
+    if not state:
+        return False
 
+    rows = state["rows"]
+    if rows == 0 or rows > len(index) or index[rows - 1] != state["last_timestamp"]:
+        return False
 
-def compute_bayesian_regime(market_data: pd.DataFrame) -> pd.DataFrame:
-    required_fields = [
-        "macro_score",
-        "credit_stress_z",
-        "curve_slope",
-        "macro_liquidity_z",
-        "dollar_regime_z"
-    ]
+    # any change to already-filtered inputs (revised macro data, shifted window) forces a full pass
+    return _factor_digest(values[:rows], index[:rows]) == state["digest"]
 
-    for field in required_fields:
+
+def advance_regime_state(
+    market_data: pd.DataFrame,
+    state: Optional[Dict[str, Any]] = None
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    for field in REGIME_FACTORS:
         if field not in market_data.columns:
             market_data[field] = 0.0
 
-    # each regime defined by how it "expects" each macro input to behave
-    regime_templates = {
-        "Expansion": {
-            "macro_score": (1.0, 0.8),
-            "credit_stress_z": (-0.5, 1.0),
-            "curve_slope": (1.0, 1.0),
-            "macro_liquidity_z": (-0.5, 1.0),
-            "dollar_regime_z": (-0.2, 1.0),
-        },
-        "Slowdown": {
-            "macro_score": (0.0, 0.7),
-            "credit_stress_z": (0.5, 1.0),
-            "curve_slope": (0.0, 1.0),
-            "macro_liquidity_z": (0.5, 1.0),
-            "dollar_regime_z": (0.5, 1.0),
-        },
-        "Stress": {
-            "macro_score": (-1.5, 0.8),
-            "credit_stress_z": (2.0, 1.2),
-            "curve_slope": (-1.0, 1.5),
-            "macro_liquidity_z": (1.5, 1.2),
-            "dollar_regime_z": (1.5, 1.2),
-        },
+    values = market_data[REGIME_FACTORS].to_numpy(dtype=float)
+    index = market_data.index
+
+    if _can_resume(state, values, index):
+        done = state["rows"]
+        new_path, prior = _run_filter(_log_likelihoods(values[done:]), state["prior"])
+        path = np.vstack([state["path"], new_path])
+    else:
+        prior = np.full(len(REGIME_NAMES), 1 / len(REGIME_NAMES))
+        path, prior = _run_filter(_log_likelihoods(values), prior)
+
+    new_state = {
+        "rows": len(index),
+        "last_timestamp": index[-1] if len(index) else None,
+        "digest": _factor_digest(values, index),
+        "prior": prior,
+        "path": path,
     }
 
-    regime_names = list(regime_templates.keys())
-    prior = np.full(len(regime_names), 1 / len(regime_names))
+    return _regime_frame(path, index), new_state
 
-    probability_path = []
 
-    for _, row in market_data.iterrows():
-        likelihoods = []
+def regime_state_path(state_key: str):
+    safe_key = state_key.replace("^", "").replace(".", "_")
+    return STATE_DIR / f"{safe_key}.pkl"
 
-        for regime in regime_names:
-            regime_definition = regime_templates[regime]
 
-            likelihood = 1.0
-            for factor, (mean, std) in regime_definition.items():
-                likelihood *= _normal_pdf(row[factor], mean, std)
+def load_regime_state(state_key: str) -> Optional[Dict[str, Any]]:
+    path = regime_state_path(state_key)
 
-            likelihoods.append(likelihood)
+    if not path.exists():
+        return None
 
-        likelihoods = np.array(likelihoods)
+    try:
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except Exception as e:
+        logger.warning(f"Failed to load regime state for {state_key}: {e}")
+        return None
 
-        if likelihoods.sum() == 0:
-            likelihoods[:] = 1 / len(likelihoods)
 
-        posterior = prior * likelihoods
-        posterior /= posterior.sum()
+def save_regime_state(state_key: str, state: Dict[str, Any]):
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    path = regime_state_path(state_key)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
 
-        probability_path.append(posterior)
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(state, f)
+        tmp_path.replace(path)
+    except Exception as e:
+        logger.warning(f"Failed to save regime state for {state_key}: {e}")
 
-        # smooth transition so regimes don't flip unrealistically fast
-        prior = posterior * 0.9 + (1 / len(prior)) * 0.1
 
-    regime_df = pd.DataFrame(
-        probability_path,
-        columns=[f"P_{name}" for name in regime_names],
-        index=market_data.index
-    )
+def compute_bayesian_regime(market_data: pd.DataFrame, state_key: Optional[str] = None) -> pd.DataFrame:
+    for field in REGIME_FACTORS:
+        if field not in market_data.columns:
+            market_data[field] = 0.0
 
-    regime_df["Regime"] = regime_df.idxmax(axis=1).str.replace("P_", "")
+    # the factors are macro-only, so tickers on one calendar share a single filter pass
+    digest = _factor_digest(market_data[REGIME_FACTORS].to_numpy(dtype=float), market_data.index)
 
-    return regime_df
+    with _memo_lock:
+        memo = _regime_memo.get(digest)
+        if memo is not None:
+            _regime_memo.move_to_end(digest)
+            return memo.copy()
+
+    if state_key is None:
+        regime_df, _ = advance_regime_state(market_data)
+    else:
+        regime_df, state = advance_regime_state(market_data, load_regime_state(state_key))
+        save_regime_state(state_key, state)
+
+    with _memo_lock:
+        _regime_memo[digest] = regime_df
+        while len(_regime_memo) > REGIME_MEMO_SIZE:
+            _regime_memo.popitem(last=False)
+
+    return regime_df.copy()
+
+
+def clear_regime_memo():
+    with _memo_lock:
+        _regime_memo.clear()
@@ -0,0 +1,70 @@
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# processes for the cpu-bound pipeline stages; 0 runs them inline in the calling thread
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def cpu_share() -> int:
+    # cores this process may spread its own threads (lightgbm) over: the whole machine, or
+    # its slice of it inside a pool worker, so workers x threads stays at the core count
+    return int(os.getenv("CPU_SHARE", "0")) or (os.cpu_count() or 1)
+
+
+def _init_worker(share: int):
+    os.environ["CPU_SHARE"] = str(share)
+
+
+def get_cpu_pool() -> Optional[ProcessPoolExecutor]:
+    global _pool
+
+    if CPU_WORKERS <= 0:
+        return None
+
+    with _lock:
+        if _pool is None:
+            # spawn, not fork: the parent runs http pools, schedulers and lightgbm threads.
+            # workers start with empty in-memory caches (regime memo, macro layers, folds, models)
+            # and warm their own; the on-disk stores are what they share
+            _pool = ProcessPoolExecutor(
+                max_workers=CPU_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(max(1, cpu_share() // CPU_WORKERS),),
+            )
+        return _pool
+
+
+def run_cpu(fn: Callable[..., Any], *args) -> Any:
+    # fn and args must be picklable (module-level function, plain data) when a pool is used
+    pool = get_cpu_pool()
+    if pool is None:
+        return fn(*args)
+
+    try:
+        return pool.submit(fn, *args).result()
+    except BrokenProcessPool:
+        # a worker died (oom, segfault): drop the pool so the next call starts a fresh one
+        logger.error("CPU worker pool broke, restarting it on next use")
+        shutdown_cpu_pool(wait=False)
+        raise
+
+
+def shutdown_cpu_pool(wait: bool = True):
+    global _pool
+
+    with _lock:
+        pool, _pool = _pool, None
+
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=not wait)
@@ -1,50 +1,126 @@
+import threading
+import weakref
+from sqlalchemy import func, inspect, or_, select, text
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
+from typing import Any, Dict, Iterable, List, Optional, Union
 from app.models import MarketData
 import pandas as pd
 import numpy as np
 
+# rows per executemany batch; each batch is committed on its own
+WRITE_CHUNK_SIZE = 5000
 
-def save_market_data(db: Session, market_data: pd.DataFrame, ticker: str):
-    # replace existing records for this ticker
-    db.query(MarketData).filter(MarketData.ticker == ticker).delete()
+# dataframe column -> market_data column
+MARKET_COLUMNS = {
+    "Open": "open",
+    "High": "high",
+    "Low": "low",
+    "Close": "close",
+    "Volume": "volume",
+    "SMA_200": "sma_200",
+    "RSI_14": "rsi_14",
+    "ATR_14": "atr_14",
+    "ATR_Z": "atr_z",
+    "Regime": "regime",
+}
 
+_INSERTS = {
+    "sqlite": sqlite.insert,
+    "postgresql": postgresql.insert,
+}
+
+
+def _market_records(market_data: pd.DataFrame, ticker: str) -> List[Dict[str, Any]]:
     data_to_store = market_data.copy()
 
     if data_to_store.index.tz is not None:
         data_to_store.index = data_to_store.index.tz_localize(None)
 
-    expected_columns = [
-        "Open", "High", "Low", "Close", "Volume",
-        "SMA_200", "RSI_14", "ATR_14", "ATR_Z", "Regime"
-    ]
-
-    for col in expected_columns:
+    for col in MARKET_COLUMNS:
         if col not in data_to_store.columns:
             data_to_store[col] = None
 
-    data_to_store = data_to_store.replace({np.nan: None})
-
-    records = []
-    for date, row in data_to_store.iterrows():
-        records.append(
-            MarketData(
-                ticker=ticker,
-                date=date,
-                open=row["Open"],
-                high=row["High"],
-                low=row["Low"],
-                close=row["Close"],
-                volume=row["Volume"],
-                sma_200=row["SMA_200"],
-                rsi_14=row["RSI_14"],
-                atr_14=row["ATR_14"],
-                atr_z=row["ATR_Z"],
-                regime=row["Regime"],
-            )
-        )
-
-    db.add_all(records)
-    db.commit()
+    records = data_to_store[list(MARKET_COLUMNS)].rename(columns=MARKET_COLUMNS).astype(object)
+    records = records.where(records.notna(), None)
+
+    records.insert(0, "date", data_to_store.index.to_pydatetime())
+    records.insert(0, "ticker", ticker)
+
+    return records.to_dict("records")
+
+
+UPSERT_INDEX = "ix_market_data_ticker_date"
+
+_migrated_lock = threading.Lock()
+_migrated = weakref.WeakSet()
+
+
+def ensure_upsert_index(db: Session):
+    # databases created before the unique (ticker, date) index existed don't have it, and the
+    # upsert's ON CONFLICT needs it; duplicates from the old delete+insert path are dropped first,
+    # keeping the newest row of each
+    bind = db.get_bind()
+    engine = getattr(bind, "engine", bind)
+
+    with _migrated_lock:
+        if engine in _migrated:
+            return
+
+    table = MarketData.__table__.name
+    if UPSERT_INDEX not in {index["name"] for index in inspect(bind).get_indexes(table)}:
+        db.execute(text(
+            f"DELETE FROM {table} WHERE id NOT IN (SELECT MAX(id) FROM {table} GROUP BY ticker, date)"
+        ))
+        db.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {UPSERT_INDEX} ON {table} (ticker, date)"))
+        db.commit()
+
+    with _migrated_lock:
+        _migrated.add(engine)
+
+
+def _upsert_statement(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect not in _INSERTS:
+        raise ValueError(f"Bulk upsert not supported for {dialect}")
+
+    table = MarketData.__table__
+    statement = _INSERTS[dialect](table)
+    columns = list(MARKET_COLUMNS.values())
+
+    # rows whose values are unchanged are left alone rather than rewritten
+    changed = or_(*[table.c[col].is_distinct_from(statement.excluded[col]) for col in columns])
+
+    return statement.on_conflict_do_update(
+        index_elements=["ticker", "date"],
+        set_={col: statement.excluded[col] for col in columns},
+        where=changed,
+    )
+
+
+def last_stored_date(db: Session, ticker: str):
+    return db.query(func.max(MarketData.date)).filter(MarketData.ticker == ticker).scalar()
+
+
+def save_market_data(db: Session, market_data: pd.DataFrame, ticker: str, append_only: bool = False) -> int:
+    if append_only:
+        last_date = last_stored_date(db, ticker)
+        if last_date is not None:
+            index = market_data.index.tz_localize(None) if market_data.index.tz is not None else market_data.index
+            market_data = market_data[index > last_date]
+
+        statement = MarketData.__table__.insert()
+    else:
+        ensure_upsert_index(db)
+        statement = _upsert_statement(db)
+
+    records = _market_records(market_data, ticker)
+
+    for start in range(0, len(records), WRITE_CHUNK_SIZE):
+        db.execute(statement, records[start:start + WRITE_CHUNK_SIZE])
+        db.commit()
+
+    return len(records)
 
 
 def get_market_data(db: Session, ticker: str):
@@ -54,3 +130,73 @@ def get_market_data(db: Session, ticker: str):
         .order_by(MarketData.date)
         .all()
     )
+
+
+def _market_query(
+    tickers: Union[str, Iterable[str]],
+    start=None,
+    end=None,
+    columns: Optional[List[str]] = None
+):
+    table = MarketData.__table__
+    ticker_list = [tickers] if isinstance(tickers, str) else list(tickers)
+    selected = columns or list(MARKET_COLUMNS)
+
+    # (ticker, date) leads the composite index, so this is a range scan per ticker
+    query = (
+        select(table.c.ticker, table.c.date, *[table.c[MARKET_COLUMNS[col]] for col in selected])
+        .where(table.c.ticker.in_(ticker_list))
+        .order_by(table.c.ticker, table.c.date)
+    )
+
+    if start is not None:
+        query = query.where(table.c.date >= pd.Timestamp(start).to_pydatetime())
+    if end is not None:
+        query = query.where(table.c.date <= pd.Timestamp(end).to_pydatetime())
+
+    return query, selected
+
+
+def get_market_arrays(
+    db: Session,
+    tickers: Union[str, Iterable[str]],
+    start=None,
+    end=None,
+    columns: Optional[List[str]] = None
+) -> Dict[str, np.ndarray]:
+    query, selected = _market_query(tickers, start, end, columns)
+    rows = db.execute(query).fetchall()
+
+    names = ["Ticker", "Date"] + selected
+    arrays = {}
+    columns_data = list(zip(*rows)) if rows else [()] * len(names)
+
+    for name, values in zip(names, columns_data):
+        if name in ("Ticker", "Regime"):
+            arrays[name] = np.array(values, dtype=object)
+        elif name == "Date":
+            arrays[name] = np.array(values, dtype="datetime64[ns]")
+        else:
+            arrays[name] = np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+    return arrays
+
+
+def get_market_frame(
+    db: Session,
+    tickers: Union[str, Iterable[str]],
+    start=None,
+    end=None,
+    columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    arrays = get_market_arrays(db, tickers, start, end, columns)
+
+    ticker = arrays.pop("Ticker")
+    dates = pd.DatetimeIndex(arrays.pop("Date"), name="Date")
+
+    # a single ticker comes back date-indexed; several come back long, indexed by (ticker, date)
+    if isinstance(tickers, str):
+        return pd.DataFrame(arrays, index=dates)
+
+    index = pd.MultiIndex.from_arrays([ticker, dates], names=["Ticker", "Date"])
+    return pd.DataFrame(arrays, index=index)
@@ -3,11 +3,24 @@ from plotly.subplots import make_subplots
 import pandas as pd
 from typing import List, Dict, Any, Optional
 
+from app.downsample import downsample, shared_indices
+
+# chart width assumed when the client doesn't send one (the chart column of the page)
+DEFAULT_WIDTH = 1200
+# lttb needs about a point per pixel; min-max spends its budget as a low/high pair per two pixels
+POINTS_PER_PIXEL = 1
+MIN_POINTS = 100
+# past this many bars, line traces switch to webgl
+WEBGL_MIN_POINTS = 1000
+
+REGIME_COLUMNS = ["P_Expansion", "P_Slowdown", "P_Stress"]
+
 
 def create_dashboard(
     market_data: pd.DataFrame,
     live_data: Optional[List[Dict[str, Any]]] = None,
-    macro_summary: Optional[Dict[str, Any]] = None
+    macro_summary: Optional[Dict[str, Any]] = None,
+    width: Optional[int] = None,
 ):
     specs = [
         [{"type": "indicator"}, {"type": "indicator"}, {"type": "indicator"}],
@@ -63,14 +76,19 @@ def create_dashboard(
             col=1,
         )
 
-    # IMPORTANT: convert everything to lists before plotting
-    x_vals = market_data.index.tolist()
+    # one target point budget for every series, from the width the chart is drawn at
+    max_points = max(MIN_POINTS, int((width or DEFAULT_WIDTH) * POINTS_PER_PIXEL))
+    long_series = len(market_data) > WEBGL_MIN_POINTS
+
+    def series_trace(series: pd.Series, method: str = "lttb", **kwargs):
+        series = downsample(series, max_points, method)
+        trace = go.Scattergl if long_series else go.Scatter
+        return trace(x=series.index.tolist(), y=series.tolist(), **kwargs)
 
     if "Cumulative_Strategy" in market_data.columns:
         figure.add_trace(
-            go.Scatter(
-                x=x_vals,
-                y=market_data["Cumulative_Strategy"].tolist(),
+            series_trace(
+                market_data["Cumulative_Strategy"],
                 name="Strategy Equity",
                 line=dict(color="lime"),
             ),
@@ -82,9 +100,8 @@ def create_dashboard(
         benchmark = (market_data["Close"] / market_data["Close"].iloc[0]) * initial_capital
 
         figure.add_trace(
-            go.Scatter(
-                x=x_vals,
-                y=benchmark.tolist(),
+            series_trace(
+                benchmark,
                 name="Benchmark (Buy & Hold)",
                 line=dict(color="white", width=1),
                 opacity=0.5,
@@ -94,9 +111,8 @@ def create_dashboard(
         )
     else:
         figure.add_trace(
-            go.Scatter(
-                x=x_vals,
-                y=market_data["Close"].tolist(),
+            series_trace(
+                market_data["Close"],
                 name="Price",
                 line=dict(color="white", width=1),
                 opacity=0.5,
@@ -106,41 +122,45 @@ def create_dashboard(
         )
 
     if "P_Expansion" in market_data.columns:
-        figure.add_trace(go.Scatter(x=x_vals, y=market_data["P_Expansion"].tolist(),
+        # stacked areas must share x, and scattergl can't stack, so these stay svg
+        regimes = market_data.iloc[shared_indices(market_data, REGIME_COLUMNS, max_points)]
+        x_vals = regimes.index.tolist()
+
+        figure.add_trace(go.Scatter(x=x_vals, y=regimes["P_Expansion"].tolist(),
                                    name="Expansion Prob", line=dict(color="green"), stackgroup="one"), row=3, col=1)
 
-        figure.add_trace(go.Scatter(x=x_vals, y=market_data["P_Slowdown"].tolist(),
+        figure.add_trace(go.Scatter(x=x_vals, y=regimes["P_Slowdown"].tolist(),
                                    name="Slowdown Prob", line=dict(color="orange"), stackgroup="one"), row=3, col=1)
 
-        figure.add_trace(go.Scatter(x=x_vals, y=market_data["P_Stress"].tolist(),
+        figure.add_trace(go.Scatter(x=x_vals, y=regimes["P_Stress"].tolist(),
                                    name="Stress Prob", line=dict(color="red"), stackgroup="one"), row=3, col=1)
 
     if "recession_probability" in market_data.columns:
-        figure.add_trace(go.Scatter(x=x_vals, y=market_data["recession_probability"].tolist(),
-                                   name="Recession Prob", line=dict(color="red", dash="dot")), row=4, col=1)
+        figure.add_trace(series_trace(market_data["recession_probability"],
+                                      name="Recession Prob", line=dict(color="red", dash="dot")), row=4, col=1)
 
     if "liquidity_stress_index" in market_data.columns:
-        figure.add_trace(go.Scatter(x=x_vals, y=market_data["liquidity_stress_index"].tolist(),
-                                   name="Liquidity Stress Index", line=dict(color="cyan")), row=4, col=1)
+        figure.add_trace(series_trace(market_data["liquidity_stress_index"],
+                                      name="Liquidity Stress Index", line=dict(color="cyan")), row=4, col=1)
     elif "macro_liquidity_z" in market_data.columns:
-        figure.add_trace(go.Scatter(x=x_vals, y=market_data["macro_liquidity_z"].tolist(),
-                                   name="Liquidity Stress (Z)", line=dict(color="cyan")), row=4, col=1)
+        figure.add_trace(series_trace(market_data["macro_liquidity_z"],
+                                      name="Liquidity Stress (Z)", line=dict(color="cyan")), row=4, col=1)
 
+    # the oscillators are spiky, so min-max keeps their extremes
     if "Fear_Greed" in market_data.columns:
-        figure.add_trace(go.Scatter(x=x_vals, y=market_data["Fear_Greed"].tolist(),
-                                   name="Fear & Greed Proxy", line=dict(color="yellow")), row=5, col=1)
-
-        figure.add_trace(go.Scatter(x=x_vals, y=[80] * len(x_vals),
-                                   line=dict(color="green", dash="dot", width=1),
-                                   showlegend=False, hoverinfo="skip"), row=5, col=1)
+        figure.add_trace(series_trace(market_data["Fear_Greed"], "minmax",
+                                      name="Fear & Greed Proxy", line=dict(color="yellow")), row=5, col=1)
 
-        figure.add_trace(go.Scatter(x=x_vals, y=[20] * len(x_vals),
-                                   line=dict(color="red", dash="dot", width=1),
-                                   showlegend=False, hoverinfo="skip"), row=5, col=1)
+        # layout shapes instead of full-length constant traces; the empty-subplot check trips over
+        # the indicator cells, so skip it
+        figure.add_hline(y=80, line=dict(color="green", dash="dot", width=1), row=5, col=1,
+                         exclude_empty_subplots=False)
+        figure.add_hline(y=20, line=dict(color="red", dash="dot", width=1), row=5, col=1,
+                         exclude_empty_subplots=False)
 
     if "Market_Stress" in market_data.columns:
-        figure.add_trace(go.Scatter(x=x_vals, y=market_data["Market_Stress"].tolist(),
-                                   name="Market Stress", line=dict(color="magenta")), row=5, col=1)
+        figure.add_trace(series_trace(market_data["Market_Stress"], "minmax",
+                                      name="Market Stress", line=dict(color="magenta")), row=5, col=1)
 
     figure.update_layout(template="plotly_dark", height=1400,
                          title_text="Follow me on GitHub @joshmode")
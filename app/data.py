@@ -1,60 +1,275 @@
+import json
 import logging
-import pickle
-import pandas as pd
-import requests
+import os
+import shutil
+import threading
 import time
 import random
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+from app import http_client
+from app.rate_limit import CircuitBreaker, TokenBucket
 
 logger = logging.getLogger(__name__)
 
 CACHE_DIR = Path(__file__).parent / "cache"
+PRICE_CACHE_DIR = CACHE_DIR / "prices"
+
+# each cached segment is one float64 block: row 0 holds epoch seconds, then one row per column
+CACHE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+CACHE_TTL = timedelta(hours=12)
+
+# least recently read price series are evicted once the cache grows past this
+PRICE_CACHE_MAX_BYTES = int(os.getenv("PRICE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# appended delta segments are folded back into one once a series has this many
+MAX_CACHE_SEGMENTS = 16
+
+PERIOD_OFFSETS = {
+    "1d": pd.DateOffset(days=1),
+    "5d": pd.DateOffset(days=5),
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+
+YAHOO_HOSTS = ["query1.finance.yahoo.com", "query2.finance.yahoo.com"]
+
+# one bucket shared by every fetch in the process, one breaker per host
+YAHOO_RATE_PER_SEC = float(os.getenv("YAHOO_RATE_PER_SEC", "4"))
+YAHOO_BURST = float(os.getenv("YAHOO_BURST", "8"))
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+
+MAX_FETCH_ATTEMPTS = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+_rate_limiter = TokenBucket(YAHOO_RATE_PER_SEC, YAHOO_BURST)
+_breakers = {host: CircuitBreaker() for host in YAHOO_HOSTS}
 
 
 def ensure_cache_directory():
     CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    PRICE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
 
-def cache_file_path(ticker: str, period: str) -> Path:
+def cache_path(ticker: str, interval: str = "1d") -> Path:
+    # one history per (ticker, interval); every period is a slice of it
     safe_ticker = ticker.replace("^", "").replace(".", "_")
-    return CACHE_DIR / f"{safe_ticker}_{period}.pkl"
+    return PRICE_CACHE_DIR / f"{safe_ticker}_{interval}"
 
 
-def load_cached_data(ticker: str, period: str) -> Optional[pd.DataFrame]:
-    ensure_cache_directory()
-    path = cache_file_path(ticker, period)
+def _segment_files(path: Path) -> List[Path]:
+    # zero-padded write stamps keep segments ordered oldest to newest by name
+    return sorted(path.glob("seg-*.npy"))
+
+
+def _to_epoch_seconds(index: pd.Index) -> np.ndarray:
+    return pd.DatetimeIndex(index).as_unit("s").asi8.astype(np.float64)
+
+
+def _atomic_write(path: Path, write):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
 
-    if not path.exists():
-        return None
 
+def _read_meta(path: Path) -> Dict[str, Any]:
     try:
-        modified_time = datetime.fromtimestamp(path.stat().st_mtime)
-        if datetime.now() - modified_time > timedelta(hours=12):
+        return json.loads((path / "meta.json").read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _read_segment(path: Path, rows: List[int], start: Optional[float]) -> Optional[pd.DataFrame]:
+    block = np.load(path, mmap_mode="r")
+    timestamps = block[0]
+
+    # only the requested rows and the tail past `start` are paged in from the map
+    first = 0 if start is None else int(np.searchsorted(timestamps, start))
+    if first >= block.shape[1]:
+        return None
+
+    values = np.array(block[rows, first:]).T
+    index = pd.to_datetime(np.asarray(timestamps[first:]).astype(np.int64), unit="s")
+
+    return pd.DataFrame(values, index=index, columns=[CACHE_COLUMNS[r - 1] for r in rows])
+
+
+def _load_cache(
+    ticker: str,
+    interval: str = "1d",
+    start: Optional[datetime] = None,
+    columns: Optional[List[str]] = None,
+    max_age: Optional[timedelta] = CACHE_TTL
+) -> Optional[pd.DataFrame]:
+    path = cache_path(ticker, interval)
+    columns = columns or CACHE_COLUMNS
+    rows = [CACHE_COLUMNS.index(col) + 1 for col in columns]
+    start_epoch = None if start is None else float(pd.Timestamp(start).timestamp())
+
+    # the stored history only answers requests that begin inside the span it was fetched for
+    covered_from = _read_meta(path).get("covered_from")
+    if covered_from is None or (start_epoch is not None and start_epoch < covered_from):
+        return None
+
+    # a concurrent writer may replace segments between listing and opening; retry once
+    for _ in range(2):
+        segments = _segment_files(path)
+        if not segments:
             return None
 
-        with open(path, "rb") as f:
-            logger.info(f"Loaded cached data for {ticker}")
-            return pickle.load(f)
+        try:
+            # max_age=None accepts stale data, e.g. as the base for an incremental refresh
+            modified_time = datetime.fromtimestamp(segments[-1].stat().st_mtime)
+            if max_age is not None and datetime.now() - modified_time > max_age:
+                return None
 
-    except Exception as e:
-        logger.warning(f"Failed to load cache for {ticker}: {e}")
+            frames = [_read_segment(segment, rows, start_epoch) for segment in segments]
+            break
+
+        except FileNotFoundError:
+            continue
+
+        except Exception as e:
+            logger.warning(f"Failed to load cache for {ticker}: {e}")
+            return None
+    else:
         return None
 
+    frames = [frame for frame in frames if frame is not None]
+    if not frames:
+        return None
+
+    data = pd.concat(frames) if len(frames) > 1 else frames[0]
+    if len(frames) > 1:
+        # later segments win where they overlap earlier ones
+        data = data[~data.index.duplicated(keep="last")].sort_index()
+
+    data.index.name = "Date"
+
+    # bump atime only; mtime stays the freshness stamp
+    try:
+        os.utime(path, (time.time(), path.stat().st_mtime))
+    except OSError:
+        pass
+
+    logger.info(f"Loaded cached data for {ticker}")
+    return data
+
+
+def _write_segment(path: Path, data: pd.DataFrame) -> Path:
+    block = np.full((len(CACHE_COLUMNS) + 1, len(data)), np.nan)
+    block[0] = _to_epoch_seconds(data.index)
+    for row, col in enumerate(CACHE_COLUMNS, start=1):
+        if col in data:
+            block[row] = data[col].to_numpy(dtype=np.float64)
+
+    segment = path / f"seg-{time.time_ns():020d}.npy"
+    _atomic_write(segment, lambda f: np.save(f, block))
+
+    return segment
+
+
+def _cache_size(path: Path) -> int:
+    return sum(segment.stat().st_size for segment in _segment_files(path))
+
+
+def _evict_cache(keep: Path):
+    entries = []
+    for path in PRICE_CACHE_DIR.iterdir():
+        if not path.is_dir():
+            continue
+        try:
+            entries.append((path.stat().st_atime, _cache_size(path), path))
+        except FileNotFoundError:
+            continue
+
+    total = sum(size for _, size, _ in entries)
 
-def write_cache(ticker: str, period: str, data: pd.DataFrame):
+    for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+        if total <= PRICE_CACHE_MAX_BYTES:
+            break
+        if path == keep:
+            continue
+
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+        logger.info(f"Evicted cached prices {path.name}")
+
+
+def _write_cache(ticker: str, interval: str, data: pd.DataFrame, covered_from: Optional[datetime] = None):
     ensure_cache_directory()
-    path = cache_file_path(ticker, period)
+    path = cache_path(ticker, interval)
 
     try:
-        with open(path, "wb") as f:
-            pickle.dump(data, f)
+        path.mkdir(parents=True, exist_ok=True)
+        data = data.sort_index()
+        segment = _write_segment(path, data)
+
+        # the new full segment supersedes everything older
+        for stale in _segment_files(path):
+            if stale != segment:
+                stale.unlink(missing_ok=True)
+
+        # coverage reaches back to the requested start even if the ticker's first bar is later
+        meta = _read_meta(path)
+        first_epoch = float(_to_epoch_seconds(data.index[:1])[0]) if len(data) else None
+        if covered_from is not None:
+            meta["covered_from"] = float(pd.Timestamp(covered_from).timestamp())
+        if first_epoch is not None:
+            meta["covered_from"] = min(meta.get("covered_from", first_epoch), first_epoch)
+
+        _atomic_write(path / "meta.json", lambda f: f.write(json.dumps(meta).encode()))
+
+        _evict_cache(keep=path)
         logger.info(f"Cached data for {ticker}")
     except Exception as e:
         logger.warning(f"Failed to write cache for {ticker}: {e}")
 
 
+def _append_cache(ticker: str, interval: str, delta: pd.DataFrame):
+    path = cache_path(ticker, interval)
+    segments = _segment_files(path)
+
+    if not segments:
+        _write_cache(ticker, interval, delta)
+        return
+
+    try:
+        # nothing new (weekend, holiday): just mark the cached history as checked
+        if delta.empty:
+            os.utime(segments[-1])
+            return
+
+        _write_segment(path, delta.sort_index())
+
+        if len(segments) + 1 > MAX_CACHE_SEGMENTS:
+            merged = _load_cache(ticker, interval, max_age=None)
+            if merged is not None:
+                _write_cache(ticker, interval, merged)
+                return
+
+        _evict_cache(keep=path)
+    except Exception as e:
+        logger.warning(f"Failed to append cache for {ticker}: {e}")
+
+
 def yahoo_range_from_period(period: str) -> str:
     return "10y" if period == "max" else period
 
@@ -63,137 +278,218 @@ def request_headers() -> Dict[str, str]:
     return {
         "User-Agent": "Mozilla/5.0",
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Connection": "keep-alive",
     }
 
 
-def fetch_data(ticker: str = "^GSPC", period: str = "2y", interval: str = "1d") -> pd.DataFrame:
-    cached = load_cached_data(ticker, period)
-    if cached is not None:
-        return cached
+def period_start(period: str) -> Optional[pd.Timestamp]:
+    # same window yahoo's `range` covers, relative to now in naive utc like the cached index
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+
+    if period == "ytd":
+        return pd.Timestamp(year=now.year, month=1, day=1)
+
+    offset = PERIOD_OFFSETS.get(yahoo_range_from_period(period))
+    return None if offset is None else now - offset
 
-    params = {
-        "range": yahoo_range_from_period(period),
-        "interval": interval,
-        "events": "history",
-        "includeAdjustedClose": "true",
-    }
 
-    endpoints = [
-        f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}",
-        f"https://query2.finance.yahoo.com/v8/finance/chart/{ticker}",
-    ]
+def reset_rate_limits():
+    _rate_limiter.reset()
+    for breaker in _breakers.values():
+        breaker.reset()
 
+
+def _backoff_delay(attempt: int, retry_after: Optional[str] = None) -> float:
+    if retry_after and retry_after.strip().isdigit():
+        return min(float(retry_after), BACKOFF_MAX)
+
+    # full exponential step with jitter so concurrent workers don't retry in lockstep
+    return min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX) * random.uniform(0.5, 1.0)
+
+
+def _get_chart_json(ticker: str, params: Dict[str, Any], timeout: http_client.Timeout = None) -> Dict[str, Any]:
     last_error = None
 
-    for url in endpoints:
-        try:
-            time.sleep(random.uniform(1, 3))
+    for attempt in range(MAX_FETCH_ATTEMPTS):
+        retry_after = None
+        tried = 0
 
-            logger.info(f"Fetching data for {ticker}")
-            response = requests.get(url, params=params, headers=request_headers(), timeout=15)
+        # fail over between hosts within an attempt; only back off once every host has refused
+        for host in YAHOO_HOSTS:
+            if not _breakers[host].allow():
+                continue
+
+            tried += 1
+            url = f"https://{host}/v8/finance/chart/{ticker}"
+            _rate_limiter.acquire()
+
+            try:
+                logger.info(f"Fetching data for {ticker} from {host}")
+                response = http_client.get(url, params=params, headers=request_headers(), timeout=timeout)
+            except Exception as e:
+                _breakers[host].record_failure()
+                last_error = e
+                logger.warning(f"Fetch failed from {url}: {e}")
+                continue
 
-            if response.status_code == 429:
+            if response.status_code == 429 or response.status_code >= 500:
+                _breakers[host].record_failure()
+                retry_after = response.headers.get("Retry-After") if response.status_code == 429 else None
+                last_error = f"HTTP {response.status_code} from {host}"
+                logger.warning(f"Fetch throttled or failed from {url}: {response.status_code}")
                 continue
 
+            _breakers[host].record_success()
             response.raise_for_status()
-            payload = response.json()
+            return response.json()
 
-            result = payload.get("chart", {}).get("result", [])
-            if not result:
-                raise ValueError("No data returned")
+        if not tried:
+            raise RuntimeError(f"all Yahoo hosts are unavailable (circuit open), last error: {last_error}")
 
-            chart = result[0]
-            timestamps = chart.get("timestamp", [])
-            quote = chart.get("indicators", {}).get("quote", [{}])[0]
+        if attempt + 1 < MAX_FETCH_ATTEMPTS:
+            time.sleep(_backoff_delay(attempt, retry_after))
 
-            if not timestamps:
-                raise ValueError("Empty timestamp list")
+    raise RuntimeError(f"giving up after {MAX_FETCH_ATTEMPTS} attempts: {last_error}")
 
-            df = pd.DataFrame(
-                {
-                    "Open": quote.get("open", []),
-                    "High": quote.get("high", []),
-                    "Low": quote.get("low", []),
-                    "Close": quote.get("close", []),
-                    "Volume": quote.get("volume", []),
-                },
-                index=pd.to_datetime(timestamps, unit="s"),
-            )
 
-            df.index.name = "Date"
-            df = df.sort_index().dropna()
+def _request_chart(ticker: str, params: Dict[str, Any], allow_empty: bool = False) -> pd.DataFrame:
+    try:
+        payload = _get_chart_json(ticker, params)
 
-            if df.empty:
-                raise ValueError("Processed dataframe empty")
+        result = (payload.get("chart") or {}).get("result") or []
+        if not result:
+            raise ValueError("No data returned")
 
-            write_cache(ticker, period, df)
-            return df
+        chart = result[0]
+        timestamps = chart.get("timestamp", [])
+        quote = chart.get("indicators", {}).get("quote", [{}])[0]
 
-        except Exception as e:
-            logger.warning(f"Fetch failed from {url}: {e}")
-            last_error = e
+        if not timestamps and not allow_empty:
+            raise ValueError("Empty timestamp list")
 
-    raise RuntimeError(f"Data fetch failed for {ticker}: {last_error}")
+        df = pd.DataFrame(
+            {
+                "Open": quote.get("open", []),
+                "High": quote.get("high", []),
+                "Low": quote.get("low", []),
+                "Close": quote.get("close", []),
+                "Volume": quote.get("volume", []),
+            },
+            index=pd.to_datetime(timestamps, unit="s"),
+        )
 
+        df.index.name = "Date"
+        df = df.sort_index().dropna()
 
-def fetch_live_ticker(ticker: str) -> Dict[str, Any]:
+        if df.empty and not allow_empty:
+            raise ValueError("Processed dataframe empty")
+
+        return df
+
+    except Exception as e:
+        raise RuntimeError(f"Data fetch failed for {ticker}: {e}") from e
+
+
+def _refresh_cache(ticker: str, interval: str, cached: pd.DataFrame) -> pd.DataFrame:
+    # re-request from the last cached bar so a partial (intraday) last bar gets replaced
+    last_epoch = int(_to_epoch_seconds(cached.index[-1:])[0])
     params = {
-        "range": "1d",
-        "interval": "1m",
-        "includePrePost": "true",
+        "period1": last_epoch,
+        "period2": int(time.time()),
+        "interval": interval,
+        "events": "history",
+        "includeAdjustedClose": "true",
     }
 
-    endpoints = [
-        f"https://query1.finance.yahoo.com/v8/finance/chart/{ticker}",
-        f"https://query2.finance.yahoo.com/v8/finance/chart/{ticker}",
-    ]
+    delta = _request_chart(ticker, params, allow_empty=True)
+    delta = delta[delta.index >= cached.index[-1]]
+
+    _append_cache(ticker, interval, delta)
+    logger.info(f"Extended cached data for {ticker} by {len(delta)} bars")
 
-    for url in endpoints:
+    merged = pd.concat([cached, delta])
+    return merged[~merged.index.duplicated(keep="last")].sort_index()
+
+
+def _fetch_period(ticker: str, period: str, interval: str, max_age: timedelta) -> pd.DataFrame:
+    start = period_start(period)
+
+    cached = _load_cache(ticker, interval, start=start, max_age=max_age)
+    if cached is not None:
+        return cached
+
+    stale = _load_cache(ticker, interval, start=start, max_age=None)
+    if stale is not None and not stale.empty:
         try:
-            time.sleep(random.uniform(0.5, 1.5))
+            return _refresh_cache(ticker, interval, stale)
+        except Exception as e:
+            logger.warning(f"Incremental refresh failed for {ticker}, refetching: {e}")
 
-            response = requests.get(url, params=params, headers=request_headers(), timeout=10)
-            if response.status_code == 429:
-                continue
+    # the stored history doesn't reach back far enough (or is missing): fetch the whole span
+    params = {
+        "range": yahoo_range_from_period(period),
+        "interval": interval,
+        "events": "history",
+        "includeAdjustedClose": "true",
+    }
 
-            response.raise_for_status()
-            payload = response.json()
+    df = _request_chart(ticker, params)
+    _write_cache(ticker, interval, df, covered_from=start)
 
-            result = payload.get("chart", {}).get("result", [])
-            if not result:
-                continue
+    return df
 
-            meta = result[0].get("meta", {})
-            price = meta.get("regularMarketPrice")
-            prev_close = meta.get("chartPreviousClose")
 
-            if price is None:
-                quote = result[0].get("indicators", {}).get("quote", [{}])[0]
-                closes = quote.get("close", [])
-                valid_closes = [c for c in closes if c is not None]
-                if valid_closes:
-                    price = valid_closes[-1]
+def covering_period(start: pd.Timestamp) -> str:
+    # shortest yahoo range whose window reaches back to `start`
+    now = pd.Timestamp.now(tz="UTC").tz_localize(None)
+    for period, offset in PERIOD_OFFSETS.items():
+        if now - offset <= start:
+            return period
+    return "10y"
 
-            if price is None or prev_close is None:
-                continue
 
-            change = price - prev_close
-            pct_change = (change / prev_close) * 100
+def fetch_data(
+    ticker: str = "^GSPC",
+    period: str = "2y",
+    interval: str = "1d",
+    max_age: timedelta = CACHE_TTL,
+    since: Optional[pd.Timestamp] = None
+) -> pd.DataFrame:
+    if since is None:
+        return _fetch_period(ticker, period, interval, max_age)
 
+    # a fixed start instead of the period's sliding one, so the frame only grows at the end and
+    # doesn't depend on how much history the store happens to hold
+    history = _fetch_period(ticker, covering_period(since), interval, max_age)
+    return history[history.index >= since]
 
 
-            return {
-                "symbol": ticker,
-                "price": round(price, 2),
-                "change": round(change, 2),
-                "pct_change": round(pct_change, 2),
-                "timestamp": datetime.now().isoformat(),
-            }
+def fetch_many(
+    tickers: List[str],
+    period: str = "2y",
+    interval: str = "1d",
+    max_age: timedelta = CACHE_TTL
+) -> Dict[str, pd.DataFrame]:
+    # concurrent fetch_data; throttling is handled by the shared bucket, not by sleeping per ticker
+    unique = list(dict.fromkeys(tickers))
+    results = {}
 
-        except Exception:
-            continue
+    if not unique:
+        return results
 
+    with ThreadPoolExecutor(max_workers=min(FETCH_WORKERS, len(unique))) as pool:
+        futures = {pool.submit(fetch_data, ticker, period, interval, max_age): ticker for ticker in unique}
+
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                results[ticker] = future.result()
+            except Exception as e:
+                logger.warning(f"fetch_many: {ticker} failed: {e}")
+
+    return {ticker: results[ticker] for ticker in unique if ticker in results}
+
+
+def empty_quote(ticker: str) -> Dict[str, Any]:
     return {
         "symbol": ticker,
         "price": 0.0,
@@ -201,3 +497,51 @@ def fetch_live_ticker(ticker: str) -> Dict[str, Any]:
         "pct_change": 0.0,
         "timestamp": datetime.now().isoformat(),
     }
+
+
+def fetch_live_quote(ticker: str) -> Optional[Dict[str, Any]]:
+    params = {
+        "range": "1d",
+        "interval": "1m",
+        "includePrePost": "true",
+    }
+
+    try:
+        payload = _get_chart_json(ticker, params, timeout=10)
+
+        result = (payload.get("chart") or {}).get("result") or []
+        if not result:
+            return None
+
+        meta = result[0].get("meta", {})
+        price = meta.get("regularMarketPrice")
+        prev_close = meta.get("chartPreviousClose")
+
+        if price is None:
+            quote = result[0].get("indicators", {}).get("quote", [{}])[0]
+            closes = quote.get("close", [])
+            valid_closes = [c for c in closes if c is not None]
+            if valid_closes:
+                price = valid_closes[-1]
+
+        if price is None or prev_close is None:
+            return None
+
+        change = price - prev_close
+        pct_change = (change / prev_close) * 100
+
+        return {
+            "symbol": ticker,
+            "price": round(price, 2),
+            "change": round(change, 2),
+            "pct_change": round(pct_change, 2),
+            "timestamp": datetime.now().isoformat(),
+        }
+
+    except Exception as e:
+        logger.warning(f"Live quote failed for {ticker}: {e}")
+        return None
+
+
+def fetch_live_ticker(ticker: str) -> Dict[str, Any]:
+    return fetch_live_quote(ticker) or empty_quote(ticker)
@@ -0,0 +1,100 @@
+import numpy as np
+import pandas as pd
+from typing import Sequence
+
+
+def _as_numeric_x(index: pd.Index) -> np.ndarray:
+    if isinstance(index, pd.DatetimeIndex):
+        return index.asi8.astype(np.float64)
+    return np.arange(len(index), dtype=np.float64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    # largest-triangle-three-buckets: keeps first and last point, then per bucket the point
+    # forming the largest triangle with the previous pick and the next bucket's centroid
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~np.isnan(y)
+
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+
+    previous = 0
+    for b in range(threshold - 2):
+        start, end = edges[b], edges[b + 1]
+        next_start, next_end = end, edges[b + 2] if b + 2 < len(edges) else n
+        next_end = max(next_end, next_start + 1)
+
+        # gaps are left out of the centroid and can't be picked; a bucket that is all gap
+        # keeps its first point so the gap still shows
+        next_valid = valid[next_start:next_end]
+        anchor_y = y[previous] if valid[previous] else np.nan
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end][next_valid].mean() if next_valid.any() else anchor_y
+        if np.isnan(anchor_y):
+            anchor_y = avg_y
+
+        with np.errstate(invalid="ignore"):
+            area = np.abs(
+                (x[previous] - avg_x) * (y[start:end] - anchor_y)
+                - (x[previous] - x[start:end]) * (avg_y - anchor_y)
+            )
+        area = np.where(valid[start:end] & ~np.isnan(area), area, -1.0)
+
+        previous = start + int(np.argmax(area))
+        picked[b + 1] = previous
+
+    return picked
+
+
+def minmax_indices(y: np.ndarray, threshold: int) -> np.ndarray:
+    # per bucket keep the lowest and highest point, so spikes survive at any zoom
+    n = len(y)
+    if threshold >= n or threshold < 4:
+        return np.arange(n)
+
+    y = np.asarray(y, dtype=np.float64)
+    buckets = (threshold - 2) // 2
+    edges = np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+    picked = [0, n - 1]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if end <= start:
+            continue
+        block = y[start:end]
+        if np.isnan(block).all():
+            picked.append(start)
+            continue
+        picked.append(start + int(np.nanargmin(block)))
+        picked.append(start + int(np.nanargmax(block)))
+
+    return np.unique(picked)
+
+
+def downsample(series: pd.Series, threshold: int, method: str = "lttb") -> pd.Series:
+    if len(series) <= threshold:
+        return series
+
+    if method == "minmax":
+        picked = minmax_indices(series.to_numpy(), threshold)
+    else:
+        picked = lttb_indices(_as_numeric_x(series.index), series.to_numpy(), threshold)
+
+    return series.iloc[picked]
+
+
+def shared_indices(frame: pd.DataFrame, columns: Sequence[str], threshold: int) -> np.ndarray:
+    # traces drawn against each other (stacked areas) need one common x, so take the union
+    # of each column's lttb picks
+    if len(frame) <= threshold:
+        return np.arange(len(frame))
+
+    x = _as_numeric_x(frame.index)
+    picks = [lttb_indices(x, frame[column].to_numpy(), threshold) for column in columns]
+    return np.unique(np.concatenate(picks))
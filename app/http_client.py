@@ -0,0 +1,98 @@
+import os
+import logging
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Optional, Tuple, Union
+from urllib3.util import make_headers
+
+logger = logging.getLogger(__name__)
+
+# pools kept (one per host) and keep-alive connections kept per host
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "8"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "15"))
+
+Timeout = Union[None, float, Tuple[float, float]]
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_adapter: Optional[HTTPAdapter] = None
+
+
+def get_session() -> requests.Session:
+    global _session, _adapter
+
+    with _lock:
+        if _session is None:
+            # retries are the callers' business (rate limiter, breakers, backoff), not urllib3's
+            _adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=0)
+
+            session = requests.Session()
+            session.mount("https://", _adapter)
+            session.mount("http://", _adapter)
+
+            # gzip/deflate (and br/zstd when their decoders are installed), decoded transparently
+            session.headers.update(make_headers(accept_encoding=True))
+
+            _session = session
+
+        return _session
+
+
+def _timeout(timeout: Timeout) -> Tuple[float, float]:
+    if timeout is None:
+        return HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT
+    if isinstance(timeout, tuple):
+        return timeout
+    return HTTP_CONNECT_TIMEOUT, float(timeout)
+
+
+def get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Timeout = None
+) -> requests.Response:
+    return get_session().get(url, params=params, headers=headers, timeout=_timeout(timeout))
+
+
+def get_http_stats() -> Dict[str, Any]:
+    # urllib3 counts connections opened and requests sent per host pool; the gap is reuse
+    hosts = {}
+
+    with _lock:
+        adapter = _adapter
+
+    if adapter is not None:
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+
+            stats = hosts.setdefault(pool.host, {"connections": 0, "requests": 0})
+            stats["connections"] += pool.num_connections
+            stats["requests"] += pool.num_requests
+
+    for stats in hosts.values():
+        stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+
+    return {
+        "connections": sum(s["connections"] for s in hosts.values()),
+        "requests": sum(s["requests"] for s in hosts.values()),
+        "reused": sum(s["reused"] for s in hosts.values()),
+        "hosts": hosts,
+    }
+
+
+def close_session():
+    global _session, _adapter
+
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _adapter = None
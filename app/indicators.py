@@ -1,5 +1,8 @@
 import pandas as pd
 import numpy as np
+from typing import Dict, Mapping, Union
+
+from app.rolling import rolling_stats, rolling_zscore
 
 
 def calculate_sma(market_data: pd.DataFrame, window: int = 200, column: str = "Close") -> pd.Series:
@@ -24,21 +27,19 @@ def calculate_atr(market_data: pd.DataFrame, window: int = 14) -> pd.Series:
     low = market_data["Low"]
     close = market_data["Close"]
 
-    true_range = pd.concat([
-        high - low,
-        (high - close.shift()).abs(),
-        (low - close.shift()).abs(),
-    ], axis=1).max(axis=1)
+    prev_close = close.shift()
+
+    # element-wise nan-skipping max so this works on a single series or a dates x tickers block
+    true_range = np.fmax(high - low, np.fmax((high - prev_close).abs(), (low - prev_close).abs()))
 
     return true_range.ewm(alpha=1 / window, adjust=False).mean()
 
 
 def calculate_volatility_z_score(market_data: pd.DataFrame, atr_column: str = "ATR_14", window: int = 50) -> pd.Series:
-    if atr_column not in market_data.columns:
+    if atr_column not in market_data:
         raise ValueError(f"ATR column '{atr_column}' missing.")
 
-    rolling = market_data[atr_column].rolling(window=window)
-    return (market_data[atr_column] - rolling.mean()) / rolling.std()
+    return rolling_zscore(market_data[atr_column], window)
 
 
 def calculate_macd(
@@ -66,9 +67,7 @@ def calculate_bollinger_bands(
     num_std: int = 2,
     column: str = "Close"
 ):
-    rolling = market_data[column].rolling(window=window)
-    middle = rolling.mean()
-    std = rolling.std()
+    middle, std = rolling_stats(market_data[column], window)
 
     upper = middle + std * num_std
     lower = middle - std * num_std
@@ -81,14 +80,14 @@ def calculate_momentum(market_data: pd.DataFrame, window: int = 10, column: str
 
 
 def calculate_momentum_drift(market_data: pd.DataFrame, momentum_column: str = "Momentum_10", window: int = 5) -> pd.Series:
-    if momentum_column not in market_data.columns:
+    if momentum_column not in market_data:
         return pd.Series(index=market_data.index, dtype=float)
 
     return market_data[momentum_column].diff(periods=window)
 
 
 def calculate_market_stress(market_data: pd.DataFrame, atr_z_column: str = "ATR_Z", rsi_column: str = "RSI_14") -> pd.Series:
-    if atr_z_column not in market_data.columns or rsi_column not in market_data.columns:
+    if atr_z_column not in market_data or rsi_column not in market_data:
         return pd.Series(index=market_data.index, dtype=float)
 
     rsi_component = (market_data[rsi_column] - 50).abs() / 25
@@ -98,7 +97,7 @@ def calculate_market_stress(market_data: pd.DataFrame, atr_z_column: str = "ATR_
 
 
 def calculate_fear_greed_proxy(market_data: pd.DataFrame, rsi_column="RSI_14", atr_z_column="ATR_Z") -> pd.Series:
-    if rsi_column not in market_data.columns or atr_z_column not in market_data.columns:
+    if rsi_column not in market_data or atr_z_column not in market_data:
         return pd.Series(index=market_data.index, dtype=float)
 
     rsi_scaled = (market_data[rsi_column] - 50) / 50
@@ -107,9 +106,8 @@ def calculate_fear_greed_proxy(market_data: pd.DataFrame, rsi_column="RSI_14", a
     return 100 * (1 / (1 + np.exp(-raw_score / 40)))
 
 
-def add_indicators(market_data: pd.DataFrame) -> pd.DataFrame:
-    enriched = market_data.copy()
-
+def _apply_indicators(enriched):
+    # works on a single-ticker frame or a {field: dates x tickers} panel, both index by column name
     enriched["SMA_50"] = calculate_sma(enriched, window=50)
     enriched["SMA_200"] = calculate_sma(enriched, window=200)
 
@@ -133,3 +131,62 @@ def add_indicators(market_data: pd.DataFrame) -> pd.DataFrame:
     enriched["Fear_Greed"] = calculate_fear_greed_proxy(enriched)
 
     return enriched
+
+
+def add_indicators(market_data: pd.DataFrame) -> pd.DataFrame:
+    return _apply_indicators(market_data.copy())
+
+
+def to_panel(prices: Union[pd.DataFrame, Mapping[str, pd.DataFrame]]) -> Dict[str, pd.DataFrame]:
+    # accepts {ticker: frame}, a long frame indexed by (ticker, date), or wide (field, ticker) columns
+    if isinstance(prices, Mapping):
+        prices = pd.concat(prices, axis=1).swaplevel(axis=1)
+    elif isinstance(prices.index, pd.MultiIndex):
+        prices = prices.unstack(level=0)
+
+    fields = prices.columns.get_level_values(0).unique()
+    return {field: prices[field].sort_index() for field in fields}
+
+
+def add_panel_indicators(prices: Union[pd.DataFrame, Mapping[str, pd.DataFrame]]) -> pd.DataFrame:
+    panel = to_panel(prices)
+    close = panel["Close"]
+    present = close.notna()
+
+    # leading and trailing empty rows don't change rolling, ewm or shift results, so every
+    # ticker trading a contiguous range goes through one vectorised pass; only a gap inside a
+    # ticker's range would break its windows, so those tickers are computed on their own rows
+    rows = present.to_numpy()
+    first = rows.argmax(axis=0)
+    last = len(rows) - 1 - rows[::-1].argmax(axis=0)
+    gapped = rows.any(axis=0) & (rows.sum(axis=0) < last - first + 1)
+
+    contiguous = close.columns[~gapped]
+    groups = [(present[contiguous].any(axis=1).to_numpy(), contiguous)] if len(contiguous) else []
+    groups += [(rows[:, i], close.columns[[i]]) for i in np.flatnonzero(gapped)]
+
+    parts = []
+    for dates, tickers in groups:
+        group = {field: frame.loc[dates, tickers] for field, frame in panel.items()}
+        parts.append(pd.concat(_apply_indicators(group), axis=1))
+
+    fields = parts[0].columns.get_level_values(0).unique()
+    columns = pd.MultiIndex.from_product([fields, close.columns], names=[None, close.columns.name])
+    enriched = pd.concat(parts, axis=1).reindex(index=close.index, columns=columns)
+
+    # rows outside a ticker's range stay empty, as they would computed alone
+    return enriched.where(np.tile(rows, len(fields)))
+
+
+def split_panel(panel: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    frames = {}
+
+    for ticker in panel.columns.get_level_values(1).unique():
+        frame = panel.xs(ticker, axis=1, level=1)
+
+        # tickers on a shorter calendar carry empty rows in the shared index
+        frame = frame[frame["Close"].notna()]
+        frame.columns.name = None
+        frames[ticker] = frame
+
+    return frames
@@ -0,0 +1,88 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.data import fetch_live_quote, empty_quote
+from app.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+LIVE_QUOTE_TTL = float(os.getenv("LIVE_QUOTE_TTL", "15"))
+LIVE_QUOTE_WORKERS = int(os.getenv("LIVE_QUOTE_WORKERS", "4"))
+
+_lock = threading.Lock()
+
+# symbol -> (monotonic time fetched, last good quote)
+_quotes: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+
+_flight = SingleFlight()
+_pool = ThreadPoolExecutor(max_workers=LIVE_QUOTE_WORKERS, thread_name_prefix="live-quote")
+
+
+def _fetch_and_store(symbol: str) -> Optional[Dict[str, Any]]:
+    # a flight that finished just before this one already did the work
+    with _lock:
+        entry = _quotes.get(symbol)
+    if entry is not None and time.monotonic() - entry[0] <= LIVE_QUOTE_TTL:
+        return entry[1]
+
+    quote = fetch_live_quote(symbol)
+
+    # a failed refresh keeps serving the last good quote
+    if quote is not None:
+        with _lock:
+            _quotes[symbol] = (time.monotonic(), quote)
+
+    return quote
+
+
+def _refresh(symbol: str) -> Optional[Dict[str, Any]]:
+    # however many viewers miss at once, one upstream request per symbol
+    return _flight.do(symbol, _fetch_and_store, symbol)
+
+
+def get_live_quotes(symbols: List[str]) -> List[Dict[str, Any]]:
+    now = time.monotonic()
+    quotes = {}
+    missing = []
+
+    with _lock:
+        cached = {symbol: _quotes.get(symbol) for symbol in symbols}
+
+    for symbol, entry in cached.items():
+        if entry is None:
+            missing.append(symbol)
+            continue
+
+        fetched_at, quote = entry
+        quotes[symbol] = quote
+
+        # stale-while-revalidate: answer now, refresh behind the response
+        if now - fetched_at > LIVE_QUOTE_TTL and not _flight.in_flight(symbol):
+            _pool.submit(_refresh, symbol)
+
+    # nothing to fall back on: fetch the cold symbols concurrently and wait; symbols already
+    # being fetched are joined from this thread rather than parking a pool worker on them
+    pending = {}
+    for symbol in missing:
+        if _flight.in_flight(symbol):
+            pending[symbol] = None
+        else:
+            pending[symbol] = _pool.submit(_refresh, symbol)
+
+    for symbol, future in pending.items():
+        try:
+            quotes[symbol] = _refresh(symbol) if future is None else future.result()
+        except Exception as e:
+            logger.warning(f"Live quote refresh failed for {symbol}: {e}")
+
+    # copies, so callers can relabel without touching the cache
+    return [dict(quotes.get(symbol) or empty_quote(symbol)) for symbol in symbols]
+
+
+def clear_live_quotes():
+    with _lock:
+        _quotes.clear()
@@ -1,10 +1,20 @@
 import os
+import json
+import hashlib
+import time
 import logging
-import requests
+import threading
 import pandas as pd
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
-from typing import Dict, Any
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from app import http_client
+from app.data import CACHE_DIR
+from app.rolling import rolling_zscore
 
 logger = logging.getLogger(__name__)
 
@@ -25,8 +35,35 @@ SERIES = {
     "dollar": "DTWEXBGS",
 }
 
+# bounded fan-out for the series fetch; a series still running after FRED_LOAD_TIMEOUT is
+# left out of this load (its column stays empty) and lands in the cache for the next one
+FRED_WORKERS = int(os.getenv("FRED_WORKERS", "4"))
+FRED_SERIES_TIMEOUT = float(os.getenv("FRED_SERIES_TIMEOUT", "10"))
+FRED_LOAD_TIMEOUT = float(os.getenv("FRED_LOAD_TIMEOUT", "15"))
+
+FRED_STORE_DIR = CACHE_DIR / "fred"
+FRED_CACHE_TTL = timedelta(hours=24)
+
+# how far back from the last stored observation an incremental refresh re-pulls
+FRED_REVISION_WINDOW = pd.DateOffset(days=int(os.getenv("FRED_REVISION_DAYS", "180")))
+
+# process-local copy of the on-disk store, with the time each series was last refreshed
 _cache: Dict[str, Any] = {}
-_cache_expiry: Dict[str, datetime] = {}
+_cache_refreshed: Dict[str, datetime] = {}
+
+_pool = ThreadPoolExecutor(max_workers=FRED_WORKERS, thread_name_prefix="fred")
+
+_stats_lock = threading.Lock()
+_fetch_stats: Dict[str, Dict[str, Any]] = {}
+
+# (calendar digest, macro data version) -> derived macro columns, most recently used last
+MACRO_LAYER_CACHE_SIZE = int(os.getenv("MACRO_LAYER_CACHE_SIZE", "16"))
+
+_layer_lock = threading.Lock()
+_layers: "OrderedDict[Tuple[str, str], pd.DataFrame]" = OrderedDict()
+
+# last assembled macro frame: (series it was built from, frame, version)
+_macro_memo: Dict[str, Tuple[Tuple[pd.Series, ...], pd.DataFrame, str]] = {}
 
 
 def _series_or_nan(df: pd.DataFrame, column: str) -> pd.Series:
@@ -35,53 +72,198 @@ def _series_or_nan(df: pd.DataFrame, column: str) -> pd.Series:
     return pd.Series(index=df.index, dtype=float)
 
 
-def fetch_series(series_id: str) -> pd.Series:
-    now = datetime.now()
+def series_store_path(series_id: str) -> Path:
+    return FRED_STORE_DIR / f"{series_id}.npy"
+
+
+def _atomic_write(path: Path, write):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _load_stored_series(series_id: str) -> Optional[Tuple[pd.Series, Dict[str, Any]]]:
+    path = series_store_path(series_id)
+
+    try:
+        meta = json.loads(path.with_suffix(".json").read_text())
+        block = np.load(path, mmap_mode="r")
+    except (FileNotFoundError, ValueError):
+        return None
+
+    # row 0 holds observation dates as epoch seconds, row 1 the values
+    index = pd.to_datetime(np.asarray(block[0]).astype(np.int64), unit="s")
+    series = pd.Series(np.array(block[1]), index=index, name="value")
+    series.index.name = "date"
+
+    return series, meta
 
-    if series_id in _cache and now < _cache_expiry.get(series_id, datetime.min):
-        return _cache[series_id]
 
+def _store_series(series_id: str, series: pd.Series):
+    try:
+        FRED_STORE_DIR.mkdir(parents=True, exist_ok=True)
+        path = series_store_path(series_id)
+
+        block = np.empty((2, len(series)))
+        block[0] = pd.DatetimeIndex(series.index).as_unit("s").asi8
+        block[1] = series.to_numpy(dtype=np.float64)
+
+        meta = {
+            "refreshed_at": time.time(),
+            "last_observation": series.index[-1].strftime("%Y-%m-%d") if len(series) else None,
+            "observations": len(series),
+        }
+
+        # values first, metadata second: readers never pair new metadata with old values
+        _atomic_write(path, lambda f: np.save(f, block))
+        _atomic_write(path.with_suffix(".json"), lambda f: f.write(json.dumps(meta).encode()))
+    except Exception as e:
+        logger.warning(f"Failed to store {series_id}: {e}")
+
+
+def _request_observations(series_id: str, observation_start: Optional[str] = None) -> pd.Series:
     params = {
         "series_id": series_id,
         "api_key": FRED_API_KEY,
         "file_type": "json",
     }
+    if observation_start:
+        params["observation_start"] = observation_start
+
+    response = http_client.get(FRED_URL, params=params, timeout=FRED_SERIES_TIMEOUT)
+    response.raise_for_status()
+
+    observations = response.json().get("observations", [])
+    df = pd.DataFrame(observations)
+
+    if df.empty:
+        return pd.Series(dtype=float)
+
+    df["value"] = pd.to_numeric(df["value"], errors="coerce")
+    df["date"] = pd.to_datetime(df["date"])
+    return df.set_index("date")["value"]
 
-    try:
-        response = requests.get(FRED_URL, params=params, timeout=10)
-        response.raise_for_status()
 
-        observations = response.json().get("observations", [])
-        df = pd.DataFrame(observations)
+def _fetch_series(series_id: str, max_age: timedelta = FRED_CACHE_TTL) -> pd.Series:
+    now = datetime.now()
+
+    if series_id in _cache and now - _cache_refreshed.get(series_id, datetime.min) < max_age:
+        return _cache[series_id]
+
+    stored = _load_stored_series(series_id)
+    if stored is not None:
+        series, meta = stored
+        refreshed = datetime.fromtimestamp(meta.get("refreshed_at", 0))
+
+        # another worker (or an earlier run) refreshed it recently enough
+        if now - refreshed < max_age:
+            _cache[series_id] = series
+            _cache_refreshed[series_id] = refreshed
+            return series
 
-        if df.empty:
-            series = pd.Series(dtype=float)
+    try:
+        if stored is not None and len(stored[0]):
+            # re-pull a trailing window from the last stored date so recent revisions land too
+            series = stored[0]
+            start = series.index[-1] - FRED_REVISION_WINDOW
+            delta = _request_observations(series_id, start.strftime("%Y-%m-%d"))
+            if not delta.empty:
+                series = pd.concat([series[series.index < start], delta]).sort_index()
+                series = series[~series.index.duplicated(keep="last")]
         else:
-            df["value"] = pd.to_numeric(df["value"], errors="coerce")
-            df["date"] = pd.to_datetime(df["date"])
-            series = df.set_index("date")["value"]
+            series = _request_observations(series_id)
+
+        _store_series(series_id, series)
 
         _cache[series_id] = series
-        _cache_expiry[series_id] = now + timedelta(hours=24)
+        _cache_refreshed[series_id] = now
 
         return series
 
     except Exception as e:
+        if stored is not None:
+            logger.warning(f"Failed to refresh {series_id}, serving stored observations: {e}")
+            return stored[0]
+
         logger.error(f"Failed to fetch {series_id}: {e}")
         return pd.Series(dtype=float)
 
 
-def load_macro_data() -> pd.DataFrame:
+def _record_stats(series_id: str, seconds: float, status: str, observations: int):
+    with _stats_lock:
+        _fetch_stats[series_id] = {
+            "seconds": round(seconds, 4),
+            "status": status,
+            "observations": observations,
+            "at": datetime.now().isoformat(),
+        }
+
+
+def _timed_fetch(series_id: str, max_age: timedelta) -> pd.Series:
+    start = time.monotonic()
+
+    try:
+        series = _fetch_series(series_id, max_age)
+    except Exception as e:
+        logger.error(f"Failed to fetch {series_id}: {e}")
+        _record_stats(series_id, time.monotonic() - start, "error", 0)
+        return pd.Series(dtype=float)
+
+    status = "ok" if len(series) else "empty"
+    _record_stats(series_id, time.monotonic() - start, status, len(series))
+
+    return series
+
+
+def get_macro_fetch_stats() -> Dict[str, Dict[str, Any]]:
+    with _stats_lock:
+        return {series_id: dict(stats) for series_id, stats in _fetch_stats.items()}
+
+
+def load_macro_data(max_age: timedelta = FRED_CACHE_TTL) -> pd.DataFrame:
     if not FRED_API_KEY:
         logger.warning("FRED_API_KEY not set. Running in neutral macro mode.")
         return pd.DataFrame()
 
-    data = {name: fetch_series(code) for name, code in SERIES.items()}
+    now = datetime.now()
+    if all(code in _cache and now - _cache_refreshed[code] < max_age for code in SERIES.values()):
+        # everything is fresh in memory: no need to fan out
+        data = {name: _cache[code] for name, code in SERIES.items()}
+    else:
+        started = time.monotonic()
+        futures = {_pool.submit(_timed_fetch, code, max_age): name for name, code in SERIES.items()}
+        _, pending = wait(futures, timeout=FRED_LOAD_TIMEOUT)
+
+        data = {}
+        for future, name in futures.items():
+            if future in pending:
+                logger.warning(f"FRED series {SERIES[name]} timed out, leaving {name} empty")
+                _record_stats(SERIES[name], time.monotonic() - started, "timeout", 0)
+                data[name] = pd.Series(dtype=float)
+            else:
+                data[name] = future.result()
+
+    # unchanged series objects mean an unchanged frame (and macro version): reuse both
+    parts = tuple(data[name] for name in SERIES)
+    with _layer_lock:
+        memo = _macro_memo.get("frame")
+        if memo is not None and all(a is b for a, b in zip(memo[0], parts)):
+            return memo[1]
+
     macro = pd.DataFrame(data)
 
     macro = macro.ffill()
     macro.dropna(how="all", inplace=True)
 
+    with _layer_lock:
+        _macro_memo["frame"] = (parts, macro, _compute_macro_version(macro))
+
     return macro
 
 
@@ -109,13 +291,11 @@ def get_macro_summary() -> Dict[str, Any]:
     return summary
 
 
-def enrich_macro_data(market_data: pd.DataFrame) -> pd.DataFrame:
-    macro = load_macro_data()
-
+def _build_macro_layer(macro: pd.DataFrame, index: pd.Index) -> pd.DataFrame:
     if macro.empty:
-        aligned = pd.DataFrame(index=market_data.index)
+        aligned = pd.DataFrame(index=index)
     else:
-        aligned = macro.reindex(market_data.index, method="ffill")
+        aligned = macro.reindex(index, method="ffill")
 
     yield_10y = _series_or_nan(aligned, "yield_10y")
     yield_2y = _series_or_nan(aligned, "yield_2y")
@@ -157,10 +337,10 @@ def enrich_macro_data(market_data: pd.DataFrame) -> pd.DataFrame:
         "macro_shock_raw": aligned["macro_shock_raw"],
     }
 
-    for name, series in z_inputs.items():
-        mean = series.rolling(252).mean()
-        std = series.rolling(252).std()
-        aligned[f"{name}_z"] = (series - mean) / std
+    z_scores = rolling_zscore(pd.DataFrame(z_inputs, index=aligned.index), 252)
+
+    for name in z_inputs:
+        aligned[f"{name}_z"] = z_scores[name]
 
     aligned["macro_score"] = (
         +0.30 * aligned.get("growth_z")
@@ -189,7 +369,70 @@ def enrich_macro_data(market_data: pd.DataFrame) -> pd.DataFrame:
 
     aligned["liquidity_stress_index"] = 100 * (1 / (1 + np.exp(-aligned["macro_liquidity_z"])))
 
-    result = market_data.join(aligned, how="left")
+    return aligned
+
+
+def _calendar_digest(index: pd.Index) -> str:
+    return hashlib.sha1(np.ascontiguousarray(pd.DatetimeIndex(index).as_unit("ns").asi8).tobytes()).hexdigest()
+
+
+def _compute_macro_version(macro: pd.DataFrame) -> str:
+    if macro.empty:
+        return "empty"
+
+    digest = hashlib.sha1(",".join(map(str, macro.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(macro, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _macro_version(macro: pd.DataFrame) -> str:
+    with _layer_lock:
+        memo = _macro_memo.get("frame")
+    if memo is not None and memo[1] is macro:
+        return memo[2]
+    return _compute_macro_version(macro)
+
+
+def macro_data_version(macro: Optional[pd.DataFrame] = None) -> str:
+    return _macro_version(load_macro_data() if macro is None else macro)
+
+
+def get_macro_layer(index: pd.Index, macro: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    # the macro columns depend only on the fred data and the dates, so tickers sharing a
+    # calendar share one layer; callers must treat the returned frame as read-only
+    if macro is None:
+        macro = load_macro_data()
+
+    key = (_calendar_digest(index), _macro_version(macro))
+
+    with _layer_lock:
+        layer = _layers.get(key)
+        if layer is not None:
+            _layers.move_to_end(key)
+            return layer
+
+    layer = _build_macro_layer(macro, index)
+
+    with _layer_lock:
+        _layers[key] = layer
+        _layers.move_to_end(key)
+        while len(_layers) > MACRO_LAYER_CACHE_SIZE:
+            _layers.popitem(last=False)
+
+    return layer
+
+
+def clear_macro_layers():
+    with _layer_lock:
+        _layers.clear()
+        _macro_memo.clear()
+
+
+def enrich_macro_data(market_data: pd.DataFrame, macro: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    # callers running this away from the fred fetch (e.g. in a worker process) pass the frame in
+    layer = get_macro_layer(market_data.index, load_macro_data() if macro is None else macro)
+
+    result = market_data.join(layer, how="left")
     result = result.ffill()
     result = result.fillna(0)
 
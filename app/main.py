@@ -1,96 +1,226 @@
+import os
+import json
+import asyncio
+import hashlib
 import logging
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-
-from app.data import fetch_data, fetch_live_ticker
+import pandas as pd
+from typing import Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+
+from app.data import fetch_data, period_start
+from app.http_client import get_http_stats
+from app.live_quotes import get_live_quotes
 from app.indicators import add_indicators
-from app.macro import enrich_macro_data, get_macro_summary
+from app.macro import load_macro_data, enrich_macro_data, get_macro_summary, get_macro_fetch_stats, macro_data_version
 from app.bayesian_regime import compute_bayesian_regime
 from app.backtest import run_backtest
-from app.dashboard import create_dashboard
+from app.ml_engine import LOOKBACK, PURGE_GAP
+from app.dashboard import DEFAULT_WIDTH, create_dashboard
 from app.overlay import build_overlay_signal
+from app.cpu_pool import run_cpu, shutdown_cpu_pool
+from app.rendering import build_page, choose_encoding, last_modified, not_modified, render_dashboard_page
+from app.result_cache import ResultCache
+from app.scheduler import PrecomputeScheduler, SCHEDULER_ENABLED, WATCHLIST
+from app.singleflight import SingleFlight
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Macro Signal Engine")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if SCHEDULER_ENABLED:
+        scheduler.start()
+    yield
+    scheduler.stop()
+    shutdown_cpu_pool()
+
+
+app = FastAPI(title="Macro Signal Engine", lifespan=lifespan)
+
+# header quotes, with their display labels
+LIVE_SYMBOLS = {
+    "^GSPC": "S&P 500",
+    "^IXIC": "NASDAQ",
+    "^VIX": "VIX",
+}
+
+
+# finished datasets per (ticker, period), valid while their input data is unchanged
+DATASET_CACHE_ENTRIES = int(os.getenv("DATASET_CACHE_ENTRIES", "64"))
+DATASET_CACHE_MAX_BYTES = int(os.getenv("DATASET_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+_datasets = ResultCache(DATASET_CACHE_ENTRIES, DATASET_CACHE_MAX_BYTES)
+_price_fetches = SingleFlight()
+
+# rendered dashboard pages (html plus its compressed encodings) per (ticker, period, width)
+PAGE_CACHE_ENTRIES = int(os.getenv("PAGE_CACHE_ENTRIES", "64"))
+PAGE_CACHE_MAX_BYTES = int(os.getenv("PAGE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+_pages = ResultCache(PAGE_CACHE_ENTRIES, PAGE_CACHE_MAX_BYTES)
+
+
+# bars computed ahead of the first shown one: SMA_200, then the ml feature z-scores, the target
+# scaling and the first walk-forward fold's training rows, so the period opens with ml scores
+WARMUP_BARS = 200 + LOOKBACK + LOOKBACK + LOOKBACK + PURGE_GAP
+
+
+def history_anchor(start: pd.Timestamp) -> pd.Timestamp:
+    # where the computed history begins for a period starting at `start`. snapped back to the
+    # quarter start, it only moves four times a year: in between the history just grows at the
+    # end, so the regime filter resumes and cached ml folds stay valid day to day
+    return (start - pd.offsets.BDay(WARMUP_BARS)).to_period("Q").start_time
+
+
+def _dataset_version(price_data: pd.DataFrame, macro: pd.DataFrame, start: Optional[pd.Timestamp]) -> str:
+    digest = hashlib.sha1(",".join(map(str, price_data.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(price_data, index=True).to_numpy().tobytes())
+    digest.update(macro_data_version(macro).encode())
+    digest.update(str(start).encode())
+    return digest.hexdigest()
+
+
+def _compute_market_dataset(history_key: str, start: Optional[pd.Timestamp], history: pd.DataFrame, macro: pd.DataFrame):
+    # pure cpu work on already-fetched inputs, so it can run in a worker process.
+    # everything up to the predictions runs from the history anchor; the period only decides
+    # where the backtest starts
+    history = add_indicators(history)
+    history = enrich_macro_data(history, macro)
+
+    regime = compute_bayesian_regime(history, state_key=history_key)
+    history = history.join(regime)
+
+    return run_backtest(history, ticker=history_key, start=start)
 
 
 def build_market_dataset(ticker: str, period: str):
-    price_data = fetch_data(ticker, period)
-    price_data = add_indicators(price_data)
-    price_data = enrich_macro_data(price_data)
+    # cheap when warm: the price and macro stores answer from disk/memory, and the version
+    # tells whether anything the pipeline would see has changed
+
+    # day granularity, so the window (and the cached result) doesn't move with the clock
+    start = period_start(period)
+    start = None if start is None else start.normalize()
+
+    # the computed window comes from the period alone, never from what the price store holds,
+    # so one viewer's longer period can't change another's results. regime state and cached
+    # folds are kept per anchor, as each anchor filters and trains from its own first row
+    anchor = None if start is None else history_anchor(start)
+    history_key = ticker if anchor is None else f"{ticker}_{anchor:%Y%m%d}"
+
+    history = _price_fetches.do((ticker, period), fetch_data, ticker, period, since=anchor)
+    macro = load_macro_data()
+    version = _dataset_version(history, macro, start)
+
+    def compute():
+        dataset = run_cpu(_compute_market_dataset, history_key, start, history, macro)
+        # carried along so rendered pages can be keyed without rehashing the dataset
+        dataset.attrs["version"] = version
+        return dataset
+
+    # shared between concurrent callers, so treat the result as read-only
+    return _datasets.get_or_compute((ticker, period), version, compute)
+
+
+def clear_dataset_cache():
+    _datasets.clear()
+    _pages.clear()
+    scheduler.clear()
+
 
-    regime = compute_bayesian_regime(price_data)
-    price_data = price_data.join(regime)
+def _build_warm(ticker: str, period: str):
+    dataset = build_market_dataset(ticker, period)
+    return dataset, build_overlay_signal(dataset)
 
-    return run_backtest(price_data)
+
+scheduler = PrecomputeScheduler(_build_warm, WATCHLIST)
+
+
+def get_market_dataset(ticker: str, period: str):
+    # watchlist pairs are served from the precomputed result, everything else on demand
+    warm = scheduler.get(ticker, period)
+    if warm is not None:
+        return warm["dataset"]
+    return build_market_dataset(ticker, period)
+
+
+def _render_chart(dataset: pd.DataFrame, live_data, macro_summary, width: int) -> str:
+    return create_dashboard(dataset, live_data, macro_summary, width=width).to_json()
+
+
+DISPLAYED_QUOTE_FIELDS = ("symbol", "price", "change", "pct_change")
+
+
+def _page_version(dataset: pd.DataFrame, live_data, macro_summary, width: int) -> str:
+    version = dataset.attrs.get("version")
+    if version is None:
+        version = hashlib.sha1(pd.util.hash_pandas_object(dataset, index=True).to_numpy().tobytes()).hexdigest()
+
+    # only what the page shows: quotes also carry a fetch timestamp that changes on every refresh
+    quotes = [{field: quote.get(field) for field in DISPLAYED_QUOTE_FIELDS} for quote in live_data]
+
+    digest = hashlib.sha1(version.encode())
+    digest.update(json.dumps([quotes, macro_summary, width], sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def _render_page(ticker: str, period: str, width: int, dataset: pd.DataFrame, live_data, macro_summary):
+    version = _page_version(dataset, live_data, macro_summary, width)
+
+    def compute():
+        chart_json = _render_chart(dataset, live_data, macro_summary, width)
+        return build_page(render_dashboard_page(chart_json, macro_summary, width), f'W/"{version[:20]}"')
+
+    return _pages.get_or_compute((ticker, period, width), version, compute)
+
+
+def _build_overlay(ticker: str, period: str):
+    return build_overlay_signal(build_market_dataset(ticker, period))
 
 
 @app.get("/", response_class=HTMLResponse)
-def dashboard_view(ticker: str = "^GSPC", period: str = "2y"):
+async def dashboard_view(
+    request: Request,
+    ticker: str = "^GSPC",
+    period: str = "2y",
+    # chart width in css pixels, sent back by the page when its chart column differs from the
+    # default; series are downsampled to about a point per pixel
+    width: Optional[int] = Query(None, ge=200, le=8000),
+):
+    # nearby widths share one cached render
+    width = int(round((width or DEFAULT_WIDTH) / 100) * 100)
+
     try:
-        dataset = build_market_dataset(ticker, period)
-
-        live_symbols = ["^GSPC", "^IXIC", "^VIX"]
-        live_data = []
-
-        for symbol in live_symbols:
-            info = fetch_live_ticker(symbol)
-
-            if symbol == "^GSPC":
-                info["symbol"] = "S&P 500"
-            elif symbol == "^IXIC":
-                info["symbol"] = "NASDAQ"
-            elif symbol == "^VIX":
-                info["symbol"] = "VIX"
-
-            live_data.append(info)
-
-        macro_summary = get_macro_summary()
-
-        figure = create_dashboard(dataset, live_data, macro_summary)
-        chart_json = figure.to_json()
-
-        html = f"""
-        <html>
-        <head>
-            <title>marketWatch by @joshmode</title>
-            <style>
-                body {{ font-family: sans-serif; background-color: #111; color: #eee; margin: 0; padding: 20px; }}
-                .container {{ max_width: 1600px; margin: 0 auto; }}
-                .macro-table {{ width: 100%; border-collapse: collapse; margin-top: 20px; font-size: 0.9em; }}
-                .macro-table th, .macro-table td {{ padding: 8px; text-align: left; border-bottom: 1px solid #333; }}
-                .macro-table th {{ color: #888; }}
-                h2 {{ color: #00ffcc; }}
-            </style>
-        </head>
-        <body>
-        <div class="container">
-            <h2>marketWatch by @joshmode</h2>
-
-            <div style="display: grid; grid-template-columns: 1fr 3fr; gap: 20px;">
-                <div>
-                    <h3>Macro State</h3>
-                    <table class="macro-table">
-                        <tr><th>Indicator</th><th>Value</th><th>Date</th></tr>
-                        {''.join([f"<tr><td>{k}</td><td>{v['value']}</td><td>{v['date']}</td></tr>" for k, v in macro_summary.items()])}
-                    </table>
-                </div>
-                <div id="chart"></div>
-            </div>
-        </div>
-
-        <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-        <script>
-        var chart = {chart_json};
-        Plotly.newPlot('chart', chart.data, chart.layout);
-        </script>
-        </body>
-        </html>
-        """
-
-        return HTMLResponse(html)
+        # the loaders block on http and disk, so each runs on a thread while the loop keeps serving;
+        # the pipeline itself is handed on to the cpu pool from its thread
+        dataset, live_data, macro_summary = await asyncio.gather(
+            asyncio.to_thread(get_market_dataset, ticker, period),
+            asyncio.to_thread(get_live_quotes, list(LIVE_SYMBOLS)),
+            asyncio.to_thread(get_macro_summary),
+        )
+
+        for info, symbol in zip(live_data, LIVE_SYMBOLS):
+            info["symbol"] = LIVE_SYMBOLS[symbol]
+
+        page = await asyncio.to_thread(_render_page, ticker, period, width, dataset, live_data, macro_summary)
+
+        headers = {
+            "ETag": page["etag"],
+            "Last-Modified": last_modified(page),
+            # always revalidate; an unchanged page costs a 304
+            "Cache-Control": "no-cache",
+            "Vary": "Accept-Encoding",
+        }
+
+        if not_modified(page, request.headers.get("if-none-match"), request.headers.get("if-modified-since")):
+            return Response(status_code=304, headers=headers)
+
+        encoding = choose_encoding(request.headers.get("accept-encoding"), page)
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        return Response(page[encoding], media_type="text/html; charset=utf-8", headers=headers)
 
     except Exception as e:
         logger.error(f"Dashboard error: {e}")
@@ -98,11 +228,24 @@ def dashboard_view(ticker: str = "^GSPC", period: str = "2y"):
 
 
 @app.get("/api/overlay")
-def macro_overlay(ticker: str = "^GSPC", period: str = "2y"):
+async def macro_overlay(ticker: str = "^GSPC", period: str = "2y"):
     try:
-        dataset = build_market_dataset(ticker, period)
-        overlay = build_overlay_signal(dataset)
+        warm = scheduler.get(ticker, period)
+        if warm is not None:
+            return JSONResponse(warm["overlay"])
+
+        overlay = await asyncio.to_thread(_build_overlay, ticker, period)
         return JSONResponse(overlay)
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    return JSONResponse({
+        "datasets": _datasets.stats(),
+        "pages": _pages.stats(),
+        "http": get_http_stats(),
+        "macro_fetches": get_macro_fetch_stats(),
+    })
@@ -1,20 +1,52 @@
 import os
+import hashlib
 import joblib
 import logging
+import multiprocessing
 import numpy as np
 import pandas as pd
 import lightgbm as lgb
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Dict, List, Optional, Tuple
 from sklearn.metrics import accuracy_score
 
-from app.data import fetch_data
+from app.cpu_pool import cpu_share
+from app.data import CACHE_DIR, fetch_data
 from app.indicators import add_indicators
+from app.rolling import rolling_mean_std, rolling_zscore
+from app.model_registry import REGISTRY_DIR, publish_model, load_model
 
-MODEL_PATH = "ml_model.joblib"
+# models are published per ticker and feature schema; this is the registry root
+MODEL_PATH = REGISTRY_DIR
+FOLD_CACHE_DIR = CACHE_DIR / "folds"
 
 LOOKBACK = 252
 TEST_WINDOW = 63
 PURGE_GAP = 5
 
+N_ESTIMATORS = 100
+
+MODEL_PARAMS = {
+    "objective": "multiclass",
+    "num_class": 5,
+    "metric": "multi_logloss",
+    "verbosity": -1,
+    "boosting_type": "gbdt",
+    "learning_rate": 0.05,
+    "max_depth": 4,
+    # fixed histogram layout so fits don't depend on lightgbm's runtime row/col-wise probe
+    "deterministic": True,
+    "force_col_wise": True,
+}
+
+DATASET_PARAMS = {"verbosity": -1}
+
+# walk-forward folds fan out over this many processes; 1 keeps everything in-process
+ML_WORKERS = int(os.getenv("ML_WORKERS", "1"))
+# lightgbm threads per fold fit; 0 splits this process's cores (cpu_share) evenly across workers
+ML_THREADS_PER_WORKER = int(os.getenv("ML_THREADS_PER_WORKER", "0"))
+
 BASE_FEATURES = [
     "RSI_14",
     "ATR_14",
@@ -28,6 +60,12 @@ BASE_FEATURES = [
 
 logger = logging.getLogger(__name__)
 
+# out-of-sample fold predictions per ticker, keyed by _fold_key
+_fold_cache: Dict[str, Dict[str, np.ndarray]] = {}
+
+_fold_pool: Optional[ProcessPoolExecutor] = None
+_fold_pool_workers = 0
+
 
 def prepare_features(market_data: pd.DataFrame) -> pd.DataFrame:
     data = market_data.copy()
@@ -38,10 +76,11 @@ def prepare_features(market_data: pd.DataFrame) -> pd.DataFrame:
     if "Dist_SMA_200" not in data.columns:
         data["Dist_SMA_200"] = (data["Close"] - data["SMA_200"]) / data["SMA_200"]
 
-    for col in BASE_FEATURES:
-        if col in data.columns:
-            rolling = data[col].rolling(window=LOOKBACK)
-            data[f"{col}_Z"] = (data[col] - rolling.mean()) / rolling.std()
+    z_cols = [col for col in BASE_FEATURES if col in data.columns]
+    z_scores = rolling_zscore(data[z_cols], LOOKBACK)
+
+    for col in z_cols:
+        data[f"{col}_Z"] = z_scores[col]
 
     return data.dropna()
 
@@ -52,8 +91,7 @@ def build_targets(feature_data: pd.DataFrame) -> pd.DataFrame:
     data["Next_Return"] = data["Close"].shift(-1) / data["Close"] - 1
 
 
-    rolling_mean = data["Close"].pct_change(fill_method=None).rolling(LOOKBACK).mean()
-    rolling_std = data["Close"].pct_change(fill_method=None).rolling(LOOKBACK).std()
+    rolling_mean, rolling_std = rolling_mean_std(data["Close"].pct_change(fill_method=None).to_numpy(), LOOKBACK)
 
     data["Target_Z"] = (data["Next_Return"] - rolling_mean) / rolling_std
 
@@ -81,23 +119,91 @@ def purged_time_series_split(n_samples: int):
         test_end = i + TEST_WINDOW
 
         if train_start >= 0:
-            yield list(range(train_start, train_end)), list(range(test_start, test_end))
+            yield np.arange(train_start, train_end), np.arange(test_start, test_end)
+
+
+def walk_forward_folds(index: pd.Index):
+    # test windows are calendar quarters, so a fold keeps its dates (and its cache key) when
+    # the history gains or loses rows at either end; each trains on the LOOKBACK rows that end
+    # PURGE_GAP rows before its quarter. the last, still-open quarter isn't scored yet
+    if not isinstance(index, pd.DatetimeIndex):
+        yield from purged_time_series_split(len(index))
+        return
+
+    quarters = index.to_period("Q")
+    starts = np.flatnonzero(np.r_[True, quarters[1:] != quarters[:-1]])
+
+    for test_start, test_end in zip(starts[:-1], starts[1:]):
+        train_start = test_start - PURGE_GAP - LOOKBACK
+
+        if train_start >= 0:
+            yield np.arange(train_start, test_start - PURGE_GAP), np.arange(test_start, test_end)
+
+
+def get_model(n_jobs: Optional[int] = None):
+    return lgb.LGBMClassifier(n_estimators=N_ESTIMATORS, n_jobs=n_jobs, **MODEL_PARAMS)
+
+
+def _resolve_parallelism(n_workers: Optional[int], n_threads: Optional[int]) -> Tuple[int, int]:
+    workers = max(1, n_workers if n_workers is not None else ML_WORKERS)
+    threads = n_threads if n_threads is not None else ML_THREADS_PER_WORKER
+
+    if threads <= 0:
+        threads = max(1, cpu_share() // workers)
+
+    return workers, threads
+
+
+def _get_fold_pool(n_workers: int) -> ProcessPoolExecutor:
+    global _fold_pool, _fold_pool_workers
+
+    if _fold_pool is None or _fold_pool_workers != n_workers:
+        if _fold_pool is not None:
+            _fold_pool.shutdown(wait=False)
+
+        # spawn rather than fork: forking after lightgbm has started its openmp threads can hang
+        _fold_pool = ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn"))
+        _fold_pool_workers = n_workers
+
+    return _fold_pool
+
+
+def _feature_matrix(X: pd.DataFrame) -> np.ndarray:
+    return np.ascontiguousarray(X.to_numpy(dtype=np.float32))
+
+
+def _train_fold(X_train: np.ndarray, y_train: np.ndarray, X_test: np.ndarray, n_threads: int) -> np.ndarray:
+    # bins come from the fold's own training rows: binning the whole history once would let
+    # later folds' test data shape earlier folds, and a cached fold couldn't be reproduced cold
+    params = {**MODEL_PARAMS, "num_threads": n_threads}
+    train_set = lgb.Dataset(X_train, label=y_train, params=DATASET_PARAMS)
+    booster = lgb.train(params, train_set, num_boost_round=N_ESTIMATORS)
+    return booster.predict(X_test)
+
+
+def _run_folds(matrix: np.ndarray, labels: np.ndarray, folds: List[Tuple[np.ndarray, np.ndarray]], n_workers: int, n_threads: int) -> List[np.ndarray]:
+    if not folds:
+        return []
+
+    # train and test windows are contiguous, so folds get slice views rather than copies
+    X_train = [matrix[train_idx[0]:train_idx[-1] + 1] for train_idx, _ in folds]
+    y_train = [labels[train_idx[0]:train_idx[-1] + 1] for train_idx, _ in folds]
+    X_test = [matrix[test_idx[0]:test_idx[-1] + 1] for _, test_idx in folds]
 
+    if n_workers <= 1 or len(folds) <= 1:
+        return [_train_fold(*fold, n_threads) for fold in zip(X_train, y_train, X_test)]
 
-def get_model():
-    return lgb.LGBMClassifier(
-        objective="multiclass",
-        num_class=5,
-        metric="multi_logloss",
-        verbosity=-1,
-        boosting_type="gbdt",
-        n_estimators=100,
-        learning_rate=0.05,
-        max_depth=4,
-    )
+    # map keeps fold order, and every fit uses the same thread count as the serial path
+    pool = _get_fold_pool(n_workers)
+    return list(pool.map(_train_fold, X_train, y_train, X_test, repeat(n_threads)))
 
 
-def train_model(ticker: str = "^GSPC", market_data: pd.DataFrame = None):
+def train_model(
+    ticker: str = "^GSPC",
+    market_data: pd.DataFrame = None,
+    n_workers: Optional[int] = None,
+    n_threads: Optional[int] = None
+):
     logger.info(f"training model for {ticker}")
 
     if market_data is None:
@@ -115,26 +221,87 @@ def train_model(ticker: str = "^GSPC", market_data: pd.DataFrame = None):
     X = dataset[feature_cols]
     y = dataset["Target_Class"]
 
-    model = get_model()
+    n_workers, n_threads = _resolve_parallelism(n_workers, n_threads)
 
     scores = []
-    splits = list(purged_time_series_split(len(X)))
+    splits = list(walk_forward_folds(X.index))
 
-    for train_idx, test_idx in splits:
-        model.fit(X.iloc[train_idx], y.iloc[train_idx])
-        preds = model.predict(X.iloc[test_idx])
-        scores.append(accuracy_score(y.iloc[test_idx], preds))
+    matrix = _feature_matrix(X)
+    labels = y.to_numpy(dtype=np.int64)
+
+    for (_, test_idx), probs in zip(splits, _run_folds(matrix, labels, splits, n_workers, n_threads)):
+        preds = np.argmax(probs, axis=1)
+        scores.append(accuracy_score(labels[test_idx], preds))
 
     if scores:
         logger.info(f"mean cv accuracy: {np.mean(scores):.4f}")
 
+    model = get_model(n_jobs=n_threads * n_workers)
     model.fit(X, y)
-    joblib.dump(model, MODEL_PATH)
+    publish_model(ticker, feature_cols, model)
 
     return model
 
 
-def get_historical_predictions(market_data: pd.DataFrame) -> pd.Series:
+def _fold_cache_path(ticker: str):
+    safe_ticker = ticker.replace("^", "").replace(".", "_")
+    return FOLD_CACHE_DIR / f"{safe_ticker}.joblib"
+
+
+def _load_fold_cache(ticker: str) -> Dict[str, np.ndarray]:
+    if ticker in _fold_cache:
+        return _fold_cache[ticker]
+
+    path = _fold_cache_path(ticker)
+    entries = {}
+
+    if path.exists():
+        try:
+            entries = joblib.load(path)
+        except Exception as e:
+            logger.warning(f"Failed to load fold cache for {ticker}: {e}")
+
+    _fold_cache[ticker] = entries
+    return entries
+
+
+def _save_fold_cache(ticker: str, entries: Dict[str, np.ndarray]):
+    _fold_cache[ticker] = entries
+
+    FOLD_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    path = _fold_cache_path(ticker)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+
+    try:
+        with open(tmp_path, "wb") as f:
+            joblib.dump(entries, f)
+        tmp_path.replace(path)
+    except Exception as e:
+        logger.warning(f"Failed to write fold cache for {ticker}: {e}")
+
+
+def _fold_key(X: pd.DataFrame, matrix: np.ndarray, labels: np.ndarray, train_idx, test_idx) -> str:
+    # a fold's predictions only depend on its boundaries, the rows it sees and the model setup
+    digest = hashlib.sha1()
+    digest.update(repr((sorted(MODEL_PARAMS.items()), N_ESTIMATORS)).encode())
+    digest.update(",".join(X.columns).encode())
+
+    for idx in (train_idx, test_idx):
+        digest.update(f"{X.index[idx[0]]}|{X.index[idx[-1]]}|{len(idx)}".encode())
+
+    digest.update(matrix[train_idx[0]:train_idx[-1] + 1].tobytes())
+    digest.update(labels[train_idx[0]:train_idx[-1] + 1].tobytes())
+    digest.update(matrix[test_idx[0]:test_idx[-1] + 1].tobytes())
+
+    return digest.hexdigest()
+
+
+def get_historical_predictions(
+    market_data: pd.DataFrame,
+    ticker: Optional[str] = None,
+    n_workers: Optional[int] = None,
+    n_threads: Optional[int] = None
+) -> pd.Series:
     try:
         features = prepare_features(market_data)
         dataset = build_targets(features)
@@ -149,34 +316,56 @@ def get_historical_predictions(market_data: pd.DataFrame) -> pd.Series:
     y = dataset["Target_Class"]
 
     predictions = pd.Series(index=X.index, dtype=float)
-    model = get_model()
+    n_workers, n_threads = _resolve_parallelism(n_workers, n_threads)
+
+    matrix = _feature_matrix(X)
+    labels = y.to_numpy(dtype=np.int64)
 
-    for train_idx, test_idx in purged_time_series_split(len(X)):
-        model.fit(X.iloc[train_idx], y.iloc[train_idx])
-        probs = model.predict_proba(X.iloc[test_idx])
+    cached = _load_fold_cache(ticker) if ticker else {}
+    current = {}
+    pending = []
 
+    for train_idx, test_idx in walk_forward_folds(X.index):
+        key = _fold_key(X, matrix, labels, train_idx, test_idx)
+
+        if key in cached:
+            current[key] = cached[key]
+            predictions.iloc[test_idx] = cached[key]
+        else:
+            pending.append((key, train_idx, test_idx))
+
+    folds = [(train_idx, test_idx) for _, train_idx, test_idx in pending]
+
+    for (key, _, test_idx), probs in zip(pending, _run_folds(matrix, labels, folds, n_workers, n_threads)):
         expected_value = np.sum(probs * np.arange(5), axis=1)
         score = (expected_value - 2.0) / 2.0
 
+        current[key] = score
         predictions.iloc[test_idx] = score
 
-    return predictions.reindex(market_data.index).fillna(0)
+    # only folds from this run are kept, so the cache stays bounded to one history per ticker
+    if ticker and current.keys() != cached.keys():
+        _save_fold_cache(ticker, current)
 
+    return predictions.reindex(market_data.index).fillna(0)
 
-def predict_latest_score(market_data: pd.DataFrame) -> float:
-    if not os.path.exists(MODEL_PATH):
-        train_model(market_data=market_data)
-
-    if not os.path.exists(MODEL_PATH):
-        return 0.0
 
-    model = joblib.load(MODEL_PATH)
+def predict_latest_score(market_data: pd.DataFrame, ticker: str = "^GSPC") -> float:
     features = prepare_features(market_data)
 
     if features.empty:
         return 0.0
 
     feature_cols = [c for c in features.columns if c.endswith("_Z") and "Target" not in c]
+
+    model = load_model(ticker, feature_cols)
+    if model is None:
+        train_model(ticker, market_data=market_data)
+        model = load_model(ticker, feature_cols)
+
+    if model is None:
+        return 0.0
+
     latest = features.iloc[[-1]][feature_cols]
 
     probs = model.predict_proba(latest)[0]
@@ -0,0 +1,128 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+import joblib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.data import CACHE_DIR
+
+logger = logging.getLogger(__name__)
+
+REGISTRY_DIR = Path(os.getenv("MODEL_REGISTRY_DIR", str(CACHE_DIR / "models")))
+
+# loaded models kept per process, and published versions kept on disk per (ticker, schema)
+MODEL_CACHE_SIZE = int(os.getenv("MODEL_CACHE_SIZE", "32"))
+MODEL_VERSIONS_KEPT = int(os.getenv("MODEL_VERSIONS_KEPT", "3"))
+
+LATEST_POINTER = "LATEST"
+
+_lock = threading.Lock()
+
+# (ticker, schema) -> (version, model), most recently used last
+_loaded: "OrderedDict[Tuple[str, str], Tuple[str, Any]]" = OrderedDict()
+
+# pointer path -> (mtime_ns, version) so an unchanged pointer costs one stat
+_pointers: Dict[Path, Tuple[int, str]] = {}
+
+
+def schema_hash(feature_cols: List[str]) -> str:
+    return hashlib.sha1(",".join(feature_cols).encode()).hexdigest()[:12]
+
+
+def model_dir(ticker: str, feature_cols: List[str]) -> Path:
+    safe_ticker = ticker.replace("^", "").replace(".", "_")
+    return REGISTRY_DIR / safe_ticker / schema_hash(feature_cols)
+
+
+def _atomic_write(path: Path, write):
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+    try:
+        with open(tmp_path, "wb") as f:
+            write(f)
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def _latest_version(directory: Path) -> Optional[str]:
+    pointer = directory / LATEST_POINTER
+
+    try:
+        mtime_ns = pointer.stat().st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+    cached = _pointers.get(pointer)
+    if cached and cached[0] == mtime_ns:
+        return cached[1]
+
+    version = pointer.read_text().strip()
+    _pointers[pointer] = (mtime_ns, version)
+    return version
+
+
+def _prune_versions(directory: Path, keep: str):
+    artifacts = sorted(directory.glob("v*.joblib"))
+
+    for artifact in artifacts[:-MODEL_VERSIONS_KEPT]:
+        if artifact.stem != f"v{keep}":
+            artifact.unlink(missing_ok=True)
+
+
+def publish_model(ticker: str, feature_cols: List[str], model: Any) -> str:
+    directory = model_dir(ticker, feature_cols)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    # zero-padded nanosecond stamp keeps versions sortable by name
+    version = f"{time.time_ns():020d}"
+
+    # artifact first, pointer second: readers only ever see fully written versions
+    _atomic_write(directory / f"v{version}.joblib", lambda f: joblib.dump(model, f))
+    _atomic_write(directory / LATEST_POINTER, lambda f: f.write(version.encode()))
+
+    _prune_versions(directory, version)
+    logger.info(f"published model {version} for {ticker}")
+
+    return version
+
+
+def load_model(ticker: str, feature_cols: List[str]) -> Optional[Any]:
+    directory = model_dir(ticker, feature_cols)
+    key = (ticker, schema_hash(feature_cols))
+
+    version = _latest_version(directory)
+    if version is None:
+        return None
+
+    with _lock:
+        cached = _loaded.get(key)
+        if cached and cached[0] == version:
+            _loaded.move_to_end(key)
+            return cached[1]
+
+    try:
+        model = joblib.load(directory / f"v{version}.joblib")
+    except Exception as e:
+        logger.warning(f"Failed to load model {version} for {ticker}: {e}")
+        return None
+
+    with _lock:
+        _loaded[key] = (version, model)
+        _loaded.move_to_end(key)
+
+        while len(_loaded) > MODEL_CACHE_SIZE:
+            _loaded.popitem(last=False)
+
+    return model
+
+
+def clear_loaded_models():
+    with _lock:
+        _loaded.clear()
+        _pointers.clear()
@@ -1,9 +1,13 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime
+from sqlalchemy import Column, Integer, String, Float, DateTime, Index
 from app.database import Base
 
 
 class MarketData(Base):
     __tablename__ = "market_data"
+    __table_args__ = (
+        # one bar per ticker and date; also the upsert conflict target
+        Index("ix_market_data_ticker_date", "ticker", "date", unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
 
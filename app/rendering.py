@@ -0,0 +1,86 @@
+import gzip
+import time
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from app.dashboard import DEFAULT_WIDTH
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only without it
+    brotli = None
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+# compiled once; autoescape covers the macro table, the chart json is inserted raw
+_env = Environment(loader=FileSystemLoader(TEMPLATE_DIR), autoescape=select_autoescape(["html"]))
+_dashboard = _env.get_template("dashboard.html")
+
+# bodies smaller than this aren't worth compressing
+MIN_COMPRESS_BYTES = 1024
+
+
+def render_dashboard_page(chart_json: str, macro_summary: Dict[str, Any], width: int = DEFAULT_WIDTH) -> str:
+    # keep a "</script>" inside any json string from closing the script block
+    chart_json = chart_json.replace("</", "<\\/")
+    return _dashboard.render(chart_json=chart_json, macro_summary=macro_summary, width=width)
+
+
+def encodings() -> List[str]:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def build_page(html: str, etag: str) -> Dict[str, Any]:
+    # every encoding is produced once per rendered version and then served as-is
+    body = html.encode("utf-8")
+    page = {"identity": body, "etag": etag, "modified": int(time.time())}
+
+    if len(body) >= MIN_COMPRESS_BYTES:
+        page["gzip"] = gzip.compress(body, compresslevel=6, mtime=0)
+        if brotli is not None:
+            page["br"] = brotli.compress(body, quality=5)
+
+    return page
+
+
+def choose_encoding(accept_encoding: Optional[str], page: Dict[str, Any]) -> str:
+    accepted = {}
+    for item in (accept_encoding or "").split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in encodings():
+        if encoding in page and accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+
+    return "identity"
+
+
+def last_modified(page: Dict[str, Any]) -> str:
+    return formatdate(page["modified"], usegmt=True)
+
+
+def not_modified(page: Dict[str, Any], if_none_match: Optional[str], if_modified_since: Optional[str]) -> bool:
+    # if-none-match wins when both are sent; weak comparison, since only the encoding varies
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        own = page["etag"].removeprefix("W/")
+        return "*" in tags or any(tag.removeprefix("W/") == own for tag in tags)
+
+    if if_modified_since is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return page["modified"] <= since
+
+    return False
@@ -0,0 +1,99 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import pandas as pd
+
+from app.singleflight import SingleFlight
+
+
+def _size_of(value: Any) -> int:
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_size_of(v) for v in value.values())
+    return 0
+
+
+class ResultCache:
+    # lru bounded by entry count and approximate bytes; identical concurrent misses share
+    # one computation. keys are (group, version): storing a new version of a group drops
+    # the older ones, since nothing will ask for them again
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[Hashable, Hashable], Tuple[Any, int]]" = OrderedDict()
+        self._bytes = 0
+        self._flight = SingleFlight()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key):
+        _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def _store(self, key, value):
+        size = _size_of(value)
+
+        with self._lock:
+            for other in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._drop(other)
+
+            if key in self._entries:
+                self._drop(key)
+
+            self._entries[key] = (value, size)
+            self._bytes += size
+
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _compute(self, key, compute: Callable[[], Any]):
+        # a leader that queued behind an identical flight may find the result already stored
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry[0]
+
+        value = compute()
+        self._store(key, value)
+        return value
+
+    def get_or_compute(self, group: Hashable, version: Hashable, compute: Callable[[], Any]) -> Any:
+        key = (group, version)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        return self._flight.do(key, self._compute, key, compute)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self._flight.shared,
+                "in_flight": self._flight.in_flight_count(),
+                "evictions": self.evictions,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self._flight.shared = 0
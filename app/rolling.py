@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+from typing import Tuple, Union
+
+FrameOrSeries = Union[pd.Series, pd.DataFrame]
+
+BLOCK_WINDOWS = 4
+
+
+def rolling_mean_std(values: np.ndarray, window: int) -> Tuple[np.ndarray, np.ndarray]:
+    # cumulative-sum sliding window over every column at once; same nan/min_periods
+    # semantics as pandas rolling(window).mean()/.std() (ddof=1)
+    values = np.asarray(values, dtype=np.float64)
+    squeeze = values.ndim == 1
+    if squeeze:
+        values = values[:, None]
+
+    n_rows, n_cols = values.shape
+    mean = np.full((n_rows, n_cols), np.nan)
+    std = np.full((n_rows, n_cols), np.nan)
+
+    if n_rows < window or window < 1:
+        return (mean[:, 0], std[:, 0]) if squeeze else (mean, std)
+
+    # inf counts as missing: in a running sum it would poison every later window, where pandas
+    # only loses the windows that contain it
+    valid = np.isfinite(values)
+
+    zero = np.zeros((1, n_cols))
+    observed = np.concatenate([zero, np.cumsum(valid, axis=0)])
+    window_count = observed[window:] - observed[:-window]
+
+    n_out = n_rows - window + 1
+    window_mean = np.empty((n_out, n_cols))
+    variance = np.empty((n_out, n_cols))
+    block = BLOCK_WINDOWS * window
+
+    # restart the running sums every few windows, centred on the first window of the block, so
+    # rounding can't build up over long histories or as a series drifts away from where it
+    # started; blocks sit at fixed rows, so appending rows leaves earlier results bit-for-bit
+    # unchanged
+    for lo in range(0, n_out, block):
+        hi = min(lo + block, n_out)
+        segment = values[lo:hi + window - 1]
+        segment_valid = valid[lo:hi + window - 1]
+
+        head = segment_valid[:window]
+        head_count = head.sum(axis=0)
+        first = segment_valid.argmax(axis=0)
+        fallback = np.where(segment_valid.any(axis=0), segment[first, np.arange(n_cols)], 0.0)
+        shift = np.where(
+            head_count > 0,
+            np.where(head, segment[:window], 0.0).sum(axis=0) / np.maximum(head_count, 1),
+            fallback,
+        )
+        centred = np.where(segment_valid, segment - shift, 0.0)
+
+        sums = np.concatenate([zero, np.cumsum(centred, axis=0)])
+        squares = np.concatenate([zero, np.cumsum(centred * centred, axis=0)])
+        block_sum = sums[window:] - sums[:-window]
+        block_squares = squares[window:] - squares[:-window]
+        block_count = window_count[lo:hi]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            block_mean = block_sum / block_count
+            variance[lo:hi] = (block_squares - block_sum * block_mean) / (block_count - 1)
+        window_mean[lo:hi] = block_mean + shift
+
+    variance = np.maximum(variance, 0.0)
+
+    # windows holding a single repeated value get an exact zero variance, as pandas reports
+    changes = np.concatenate([zero, np.cumsum(values[1:] != values[:-1], axis=0)])
+    constant = (changes[window - 1:] - changes[:n_rows - window + 1]) == 0
+    tail = values[window - 1:]
+
+    window_mean = np.where(constant, tail, window_mean)
+    variance = np.where(constant, 0.0, variance)
+
+    complete = window_count == window
+    mean[window - 1:] = np.where(complete, window_mean, np.nan)
+    std[window - 1:] = np.where(complete, np.sqrt(variance), np.nan)
+
+    return (mean[:, 0], std[:, 0]) if squeeze else (mean, std)
+
+
+def rolling_stats(data: FrameOrSeries, window: int) -> Tuple[FrameOrSeries, FrameOrSeries]:
+    mean, std = rolling_mean_std(data.to_numpy(dtype=np.float64), window)
+
+    if isinstance(data, pd.Series):
+        return pd.Series(mean, index=data.index, name=data.name), pd.Series(std, index=data.index, name=data.name)
+
+    return (
+        pd.DataFrame(mean, index=data.index, columns=data.columns),
+        pd.DataFrame(std, index=data.index, columns=data.columns),
+    )
+
+
+def rolling_zscore(data: FrameOrSeries, window: int) -> FrameOrSeries:
+    values = data.to_numpy(dtype=np.float64)
+    mean, std = rolling_mean_std(values, window)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = (values - mean) / std
+
+    if isinstance(data, pd.Series):
+        return pd.Series(z, index=data.index, name=data.name)
+
+    return pd.DataFrame(z, index=data.index, columns=data.columns)
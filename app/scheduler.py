@@ -0,0 +1,171 @@
+import os
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from app.data import fetch_data
+from app.macro import load_macro_data
+from app.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+MARKET_TZ = ZoneInfo("America/New_York")
+
+# refresh a little after the 16:00 close so the day's final bar is published
+REFRESH_HOUR = 16
+REFRESH_MINUTE = int(os.getenv("SCHEDULER_REFRESH_MINUTE", "15"))
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "1") != "0"
+
+# a stale read won't trigger another rebuild of the same pair sooner than this
+RETRY_SECONDS = float(os.getenv("SCHEDULER_RETRY_SECONDS", "300"))
+
+Pair = Tuple[str, str]
+
+
+def parse_watchlist(value: Optional[str]) -> List[Pair]:
+    # "^GSPC:2y,^IXIC:5y,AAPL" -> [("^GSPC", "2y"), ("^IXIC", "5y"), ("AAPL", "2y")]
+    pairs = []
+
+    for item in (value or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+
+        ticker, _, period = item.partition(":")
+        pairs.append((ticker.strip(), period.strip() or "2y"))
+
+    return list(dict.fromkeys(pairs))
+
+
+WATCHLIST = parse_watchlist(os.getenv("WATCHLIST", "^GSPC:2y"))
+
+
+def _close_on(day: datetime) -> datetime:
+    return day.replace(hour=REFRESH_HOUR, minute=REFRESH_MINUTE, second=0, microsecond=0)
+
+
+def next_refresh(now: datetime) -> datetime:
+    # next weekday refresh strictly after `now` (exchange holidays aren't modelled)
+    candidate = _close_on(now.astimezone(MARKET_TZ))
+
+    while candidate <= now or candidate.weekday() >= 5:
+        candidate = _close_on(candidate + timedelta(days=1))
+
+    return candidate
+
+
+def last_refresh(now: datetime) -> datetime:
+    candidate = _close_on(now.astimezone(MARKET_TZ))
+
+    while candidate > now or candidate.weekday() >= 5:
+        candidate = _close_on(candidate - timedelta(days=1))
+
+    return candidate
+
+
+class PrecomputeScheduler:
+    # keeps `build(ticker, period) -> (dataset, overlay)` results warm for a watchlist;
+    # readers always get the stored result, and a result older than the last close
+    # triggers one background rebuild (stale-while-revalidate)
+    def __init__(self, build: Callable[[str, str], Tuple[Any, Any]], watchlist: List[Pair]):
+        self.build = build
+        self.watchlist = watchlist
+        self._lock = threading.Lock()
+        self._warm: Dict[Pair, Dict[str, Any]] = {}
+        self._attempted: Dict[Pair, float] = {}
+        self._flight = SingleFlight()
+        self._pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="precompute")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def refresh_pair(self, pair: Pair, force: bool = False):
+        return self._flight.do(pair, self._refresh_pair, pair, force)
+
+    def _refresh_pair(self, pair: Pair, force: bool):
+        ticker, period = pair
+        start = time.monotonic()
+
+        with self._lock:
+            self._attempted[pair] = start
+
+        try:
+            # max_age=0 forces the delta fetch so the close just published is picked up
+            if force:
+                fetch_data(ticker, period, max_age=timedelta(0))
+
+            dataset, overlay = self.build(ticker, period)
+        except Exception as e:
+            logger.warning(f"Precompute failed for {ticker} {period}: {e}")
+            return None
+
+        entry = {"dataset": dataset, "overlay": overlay, "built_at": datetime.now(MARKET_TZ)}
+        with self._lock:
+            self._warm[pair] = entry
+
+        logger.info(f"Precomputed {ticker} {period} in {time.monotonic() - start:.2f}s")
+        return entry
+
+    def refresh_all(self, force: bool = True):
+        if force:
+            try:
+                load_macro_data(max_age=timedelta(0))
+            except Exception as e:
+                logger.warning(f"Macro refresh failed: {e}")
+
+        for pair in self.watchlist:
+            if self._stop.is_set():
+                break
+            self.refresh_pair(pair, force=force)
+
+    def get(self, ticker: str, period: str) -> Optional[Dict[str, Any]]:
+        pair = (ticker, period)
+
+        with self._lock:
+            entry = self._warm.get(pair)
+
+        if entry is None:
+            return None
+
+        stale = entry["built_at"] < last_refresh(datetime.now(MARKET_TZ))
+
+        with self._lock:
+            recently_tried = time.monotonic() - self._attempted.get(pair, float("-inf")) < RETRY_SECONDS
+
+        if stale and not recently_tried and not self._flight.in_flight(pair):
+            self._pool.submit(self.refresh_pair, pair, True)
+
+        return entry
+
+    def _run(self):
+        self.refresh_all(force=False)
+
+        while not self._stop.is_set():
+            now = datetime.now(MARKET_TZ)
+            if self._stop.wait((next_refresh(now) - now).total_seconds()):
+                break
+            self.refresh_all(force=True)
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="precompute-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Precompute scheduler started for {len(self.watchlist)} pairs")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def clear(self):
+        with self._lock:
+            self._warm.clear()
+            self._attempted.clear()
@@ -0,0 +1,284 @@
+import math
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+
+NAN = float("nan")
+
+
+def _is_valid(value) -> bool:
+    return value is not None and not math.isnan(value)
+
+
+def _divide(numerator: float, denominator: float) -> float:
+    # ieee semantics to match vectorised pandas division (x/0 -> inf, 0/0 -> nan)
+    if denominator == 0:
+        if not _is_valid(numerator) or numerator == 0:
+            return NAN
+        return math.copysign(math.inf, numerator) * math.copysign(1.0, denominator)
+    return numerator / denominator
+
+
+def _sigmoid(value: float) -> float:
+    if value < -700:
+        return 0.0
+    return 1 / (1 + math.exp(-value))
+
+
+class RollingMean:
+    # running sum over a fixed window, same min_periods semantics as pandas rolling(window)
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.count = 0
+        self.drops = 0
+
+    def update(self, value: float) -> float:
+        self.values.append(value)
+        if _is_valid(value):
+            self.total += value
+            self.count += 1
+
+        if len(self.values) > self.window:
+            dropped = self.values.popleft()
+            if _is_valid(dropped):
+                self.total -= dropped
+                self.count -= 1
+
+            # re-sum once per full window so add/remove rounding can't drift on long-lived streams
+            self.drops += 1
+            if self.drops >= self.window:
+                self.drops = 0
+                self.total = math.fsum(v for v in self.values if _is_valid(v))
+
+        if self.count < self.window:
+            return NAN
+
+        return self.total / self.count
+
+
+class RollingStats:
+    # welford add/remove over a fixed window; returns (mean, sample std)
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.drops = 0
+        self.repeats = 0
+
+    def _add(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def _remove(self, value: float):
+        self.count -= 1
+        if self.count == 0:
+            self.mean = 0.0
+            self.m2 = 0.0
+            return
+
+        delta = value - self.mean
+        self.mean -= delta / self.count
+        self.m2 -= delta * (value - self.mean)
+
+    def _resync(self):
+        valid = [v for v in self.values if _is_valid(v)]
+        self.count = len(valid)
+        self.mean = math.fsum(valid) / self.count if valid else 0.0
+        self.m2 = math.fsum((v - self.mean) ** 2 for v in valid)
+
+    def update(self, value: float):
+        self.repeats = self.repeats + 1 if self.values and value == self.values[-1] else 1
+        self.values.append(value)
+        if _is_valid(value):
+            self._add(value)
+
+        if len(self.values) > self.window:
+            dropped = self.values.popleft()
+            if _is_valid(dropped):
+                self._remove(dropped)
+
+            # recompute from the window once per full window, as RollingMean re-sums, so
+            # add/remove rounding can't drift on long-lived streams
+            self.drops += 1
+            if self.drops >= self.window:
+                self.drops = 0
+                self._resync()
+
+        if self.count < self.window:
+            return NAN, NAN
+
+        # a window of one repeated value has an exact zero std, as pandas reports
+        if self.repeats >= self.window:
+            return value, 0.0
+
+        variance = max(self.m2, 0.0) / (self.count - 1)
+        return self.mean, math.sqrt(variance)
+
+
+class EWMean:
+    # recursive form of pandas ewm(...).mean(), including adjust=True weighting and min_periods
+    def __init__(self, alpha: float, adjust: bool = True, min_periods: int = 0):
+        self.alpha = alpha
+        self.adjust = adjust
+        self.min_periods = max(min_periods, 1)
+        self.weighted = NAN
+        self.old_weight = 1.0
+        self.count = 0
+
+    @classmethod
+    def from_span(cls, span: int, **kwargs) -> "EWMean":
+        return cls(2 / (span + 1), **kwargs)
+
+    @classmethod
+    def from_com(cls, com: float, **kwargs) -> "EWMean":
+        return cls(1 / (1 + com), **kwargs)
+
+    def update(self, value: float) -> float:
+        if _is_valid(value):
+            self.count += 1
+
+            if not _is_valid(self.weighted):
+                self.weighted = value
+            else:
+                new_weight = 1.0 if self.adjust else self.alpha
+                self.old_weight *= 1 - self.alpha
+                if self.weighted != value:
+                    self.weighted = (self.old_weight * self.weighted + new_weight * value) / (self.old_weight + new_weight)
+                self.old_weight = self.old_weight + new_weight if self.adjust else 1.0
+        elif _is_valid(self.weighted):
+            # pandas keeps decaying the old weight across gaps (ignore_na=False)
+            self.old_weight *= 1 - self.alpha
+
+        if self.count < self.min_periods:
+            return NAN
+
+        return self.weighted
+
+
+class StreamingRSI:
+    def __init__(self, window: int = 14):
+        self.avg_gain = EWMean.from_com(window - 1, min_periods=window)
+        self.avg_loss = EWMean.from_com(window - 1, min_periods=window)
+        self.prev_close: Optional[float] = None
+
+    def update(self, close: float) -> float:
+        change = NAN if self.prev_close is None else close - self.prev_close
+        self.prev_close = close
+
+        gain = self.avg_gain.update(max(change, 0.0) if _is_valid(change) else NAN)
+        loss = self.avg_loss.update(-min(change, 0.0) if _is_valid(change) else NAN)
+
+        return 100 - (100 / (1 + _divide(gain, loss)))
+
+
+class StreamingATR:
+    def __init__(self, window: int = 14):
+        self.average = EWMean(1 / window, adjust=False)
+        self.prev_close: Optional[float] = None
+
+    def update(self, high: float, low: float, close: float) -> float:
+        ranges = [high - low]
+        if self.prev_close is not None:
+            ranges += [abs(high - self.prev_close), abs(low - self.prev_close)]
+        self.prev_close = close
+
+        valid = [r for r in ranges if _is_valid(r)]
+        return self.average.update(max(valid) if valid else NAN)
+
+
+class StreamingMACD:
+    def __init__(self, fast_period: int = 12, slow_period: int = 26, signal_period: int = 9):
+        self.fast = EWMean.from_span(fast_period, adjust=False)
+        self.slow = EWMean.from_span(slow_period, adjust=False)
+        self.signal = EWMean.from_span(signal_period, adjust=False)
+
+    def update(self, price: float):
+        macd_line = self.fast.update(price) - self.slow.update(price)
+        signal_line = self.signal.update(macd_line)
+        return macd_line, signal_line, macd_line - signal_line
+
+
+class StreamingLag:
+    # keeps the last `periods` values so pct_change/diff can be taken one bar at a time
+    def __init__(self, periods: int):
+        self.values = deque(maxlen=periods + 1)
+
+    def update(self, value: float) -> Optional[float]:
+        self.values.append(value)
+        if len(self.values) < self.values.maxlen:
+            return None
+        return self.values[0]
+
+
+class StreamingIndicators:
+    # incremental counterpart of indicators.add_indicators for a single ticker
+    def __init__(self):
+        self.sma_50 = RollingMean(50)
+        self.sma_200 = RollingMean(200)
+        self.rsi = StreamingRSI(14)
+        self.atr = StreamingATR(14)
+        self.atr_stats = RollingStats(50)
+        self.macd = StreamingMACD()
+        self.bollinger = RollingStats(20)
+        self.momentum_lag = StreamingLag(10)
+        self.drift_lag = StreamingLag(5)
+
+    def update(self, bar: Dict[str, float]) -> Dict[str, float]:
+        close = bar["Close"]
+
+        rsi = self.rsi.update(close)
+        atr = self.atr.update(bar["High"], bar["Low"], close)
+
+        atr_mean, atr_std = self.atr_stats.update(atr)
+        atr_z = _divide(atr - atr_mean, atr_std)
+
+        macd, signal, hist = self.macd.update(close)
+
+        bb_mean, bb_std = self.bollinger.update(close)
+
+        lagged_close = self.momentum_lag.update(close)
+        momentum = (_divide(close, lagged_close) - 1) * 100 if lagged_close is not None else NAN
+
+        lagged_momentum = self.drift_lag.update(momentum)
+        drift = momentum - lagged_momentum if lagged_momentum is not None else NAN
+
+        market_stress = max(atr_z, 0.0) + abs(rsi - 50) / 25 if _is_valid(atr_z) else NAN
+        raw_score = ((rsi - 50) / 50) * 100 - atr_z * 20
+        fear_greed = 100 * _sigmoid(raw_score / 40) if _is_valid(raw_score) else NAN
+
+        return {
+            "SMA_50": self.sma_50.update(close),
+            "SMA_200": self.sma_200.update(close),
+            "RSI_14": rsi,
+            "ATR_14": atr,
+            "ATR_Z": atr_z,
+            "MACD": macd,
+            "MACD_Signal": signal,
+            "MACD_Hist": hist,
+            "BB_Upper": bb_mean + bb_std * 2,
+            "BB_Lower": bb_mean - bb_std * 2,
+            "Momentum_10": momentum,
+            "Momentum_Drift": drift,
+            "Market_Stress": market_stress,
+            "Fear_Greed": fear_greed,
+        }
+
+    def update_frame(self, market_data: pd.DataFrame) -> pd.DataFrame:
+        bars = market_data[["High", "Low", "Close"]].to_numpy(dtype=float)
+        rows = [self.update({"High": high, "Low": low, "Close": close}) for high, low, close in bars]
+
+        enriched = market_data.copy()
+        indicators = pd.DataFrame(rows, index=market_data.index)
+        for col in indicators.columns:
+            enriched[col] = indicators[col].astype(np.float64)
+
+        return enriched
@@ -29,3 +29,45 @@ def mock_macro_data():
         "core_inflation": np.random.rand(300),
     }, index=dates)
     return df
+
+@pytest.fixture(autouse=True)
+def isolated_model_registry(tmp_path, monkeypatch):
+    import app.model_registry as model_registry
+
+    monkeypatch.setattr(model_registry, "REGISTRY_DIR", tmp_path / "models")
+    model_registry.clear_loaded_models()
+    yield
+    model_registry.clear_loaded_models()
+
+
+@pytest.fixture(autouse=True)
+def reset_fetch_limits():
+    import app.data as data
+
+    data.reset_rate_limits()
+    yield
+    data.reset_rate_limits()
+
+
+@pytest.fixture(autouse=True)
+def clear_shared_layers():
+    from app.bayesian_regime import clear_regime_memo
+    from app.macro import clear_macro_layers
+
+    from app.main import clear_dataset_cache
+
+    clear_macro_layers()
+    clear_regime_memo()
+    clear_dataset_cache()
+    yield
+    clear_macro_layers()
+    clear_regime_memo()
+    clear_dataset_cache()
+
+
+@pytest.fixture(autouse=True)
+def inline_cpu_work(monkeypatch):
+    # keep the pipeline in-process so tests can patch the stages in app.main
+    import app.cpu_pool as cpu_pool
+
+    monkeypatch.setattr(cpu_pool, "CPU_WORKERS", 0)
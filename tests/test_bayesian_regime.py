@@ -21,3 +21,113 @@ def test_compute_bayesian_regime(mock_market_data):
     # Probabilities should sum to 1 (approx)
     probs = regime_df[['P_Expansion', 'P_Slowdown', 'P_Stress']].sum(axis=1)
     assert np.allclose(probs, 1.0)
+
+def test_compute_bayesian_regime_extreme_stress_row(mock_market_data):
+    mock_market_data['macro_score'] = 0.0
+    mock_market_data['credit_stress_z'] = 0.0
+    mock_market_data['curve_slope'] = 0.0
+    mock_market_data['macro_liquidity_z'] = 0.0
+    mock_market_data['dollar_regime_z'] = 0.0
+
+    # far enough out that every per-regime density underflows to 0 in linear space
+    mock_market_data.iloc[100, mock_market_data.columns.get_loc('macro_score')] = -40.0
+    mock_market_data.iloc[100, mock_market_data.columns.get_loc('credit_stress_z')] = 60.0
+
+    regime_df = compute_bayesian_regime(mock_market_data)
+
+    assert regime_df.iloc[100]['Regime'] == 'Stress'
+    assert not regime_df[['P_Expansion', 'P_Slowdown', 'P_Stress']].isnull().any().any()
+
+def test_compute_bayesian_regime_matches_reference_loop():
+    from app.bayesian_regime import REGIME_FACTORS, REGIME_TEMPLATES
+
+    rng = np.random.default_rng(7)
+    data = pd.DataFrame(rng.normal(size=(200, len(REGIME_FACTORS))), columns=REGIME_FACTORS)
+
+    def normal_pdf(x, mean, std):
+        return np.exp(-0.5 * ((x - mean) / std) ** 2) / (std * np.sqrt(2 * np.pi))
+
+    prior = np.full(3, 1 / 3)
+    expected = []
+    for _, row in data.iterrows():
+        likelihoods = np.array([
+            np.prod([normal_pdf(row[f], m, s) for f, (m, s) in REGIME_TEMPLATES[r].items()])
+            for r in REGIME_TEMPLATES
+        ])
+        posterior = prior * likelihoods
+        posterior /= posterior.sum()
+        expected.append(posterior)
+        prior = posterior * 0.9 + (1 / 3) * 0.1
+
+    regime_df = compute_bayesian_regime(data.copy())
+    assert np.allclose(regime_df[['P_Expansion', 'P_Slowdown', 'P_Stress']].values, np.array(expected))
+
+def _regime_inputs(n_rows, seed=3):
+    from app.bayesian_regime import REGIME_FACTORS
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        rng.normal(size=(n_rows, len(REGIME_FACTORS))),
+        columns=REGIME_FACTORS,
+        index=pd.date_range("2020-01-01", periods=n_rows, freq="D"),
+    )
+
+def test_advance_regime_state_matches_full_recompute():
+    from app.bayesian_regime import advance_regime_state
+
+    data = _regime_inputs(300)
+
+    _, state = advance_regime_state(data.iloc[:250].copy())
+    incremental, state = advance_regime_state(data.copy(), state)
+    full = compute_bayesian_regime(data.copy())
+
+    pd.testing.assert_frame_equal(incremental, full)
+    assert state["rows"] == 300
+    assert state["last_timestamp"] == data.index[-1]
+
+def test_advance_regime_state_recomputes_on_revised_history():
+    from app.bayesian_regime import advance_regime_state
+
+    data = _regime_inputs(300)
+    _, state = advance_regime_state(data.iloc[:250].copy())
+
+    revised = data.copy()
+    revised.iloc[10, 0] += 1.0
+
+    incremental, _ = advance_regime_state(revised.copy(), state)
+    pd.testing.assert_frame_equal(incremental, compute_bayesian_regime(revised.copy()))
+
+def test_compute_bayesian_regime_persists_state(tmp_path, monkeypatch):
+    import app.bayesian_regime as bayesian_regime
+
+    monkeypatch.setattr(bayesian_regime, "STATE_DIR", tmp_path)
+    data = _regime_inputs(300)
+
+    compute_bayesian_regime(data.iloc[:280].copy(), state_key="^GSPC_2y")
+    assert bayesian_regime.load_regime_state("^GSPC_2y")["rows"] == 280
+
+    result = compute_bayesian_regime(data.copy(), state_key="^GSPC_2y")
+
+    # the memo would hand back the same frame; the reference has to be a fresh full pass
+    bayesian_regime.clear_regime_memo()
+    pd.testing.assert_frame_equal(result, compute_bayesian_regime(data.copy()))
+    assert bayesian_regime.load_regime_state("^GSPC_2y")["rows"] == 300
+
+def test_compute_bayesian_regime_shares_filter_across_tickers():
+    from unittest.mock import patch
+    import app.bayesian_regime as bayesian_regime
+
+    factors = _regime_inputs(200)
+    first = factors.assign(Close=np.linspace(100, 120, 200))
+    second = factors.assign(Close=np.linspace(50, 40, 200))
+
+    with patch("app.bayesian_regime._run_filter", wraps=bayesian_regime._run_filter) as run_filter:
+        a = compute_bayesian_regime(first)
+        b = compute_bayesian_regime(second)
+
+    assert run_filter.call_count == 1
+    pd.testing.assert_frame_equal(a, b)
+
+    # callers get their own copy
+    a["Regime"] = "mutated"
+    assert (compute_bayesian_regime(first.copy())["Regime"] != "mutated").all()
@@ -0,0 +1,70 @@
+import os
+import asyncio
+import time
+import threading
+from unittest.mock import patch
+
+import pandas as pd
+
+from app import cpu_pool
+
+
+def test_run_cpu_inline_when_disabled():
+    assert cpu_pool.get_cpu_pool() is None
+    assert cpu_pool.run_cpu(os.getpid) == os.getpid()
+
+
+def test_run_cpu_uses_worker_process(monkeypatch, mock_market_data):
+    from app.indicators import add_indicators
+
+    monkeypatch.setattr(cpu_pool, "CPU_WORKERS", 1)
+
+    try:
+        assert cpu_pool.run_cpu(os.getpid) != os.getpid()
+
+        # frames round-trip through the worker unchanged
+        result = cpu_pool.run_cpu(add_indicators, mock_market_data)
+        pd.testing.assert_frame_equal(result, add_indicators(mock_market_data))
+    finally:
+        cpu_pool.shutdown_cpu_pool()
+
+    assert cpu_pool._pool is None
+
+
+def test_overlay_requests_do_not_block_each_other():
+    from app import main
+
+    def slow_build(ticker, period):
+        threading.Event().wait(0.3)
+        return {"ticker": ticker}
+
+    async def serve():
+        return await asyncio.gather(*(main.macro_overlay(ticker=t, period="2y") for t in ("A", "B", "C")))
+
+    with patch("app.main._build_overlay", side_effect=slow_build):
+        start = time.monotonic()
+        responses = asyncio.run(serve())
+        elapsed = time.monotonic() - start
+
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    # three builds at 0.3s each would take 0.9s if they ran on the event loop
+    assert elapsed < 0.7
+
+
+def test_workers_split_the_cores_for_ml_threads(monkeypatch):
+    import app.ml_engine as ml_engine
+
+    monkeypatch.setattr(cpu_pool, "CPU_WORKERS", 2)
+    cores = os.cpu_count() or 1
+
+    try:
+        assert cpu_pool.run_cpu(cpu_pool.cpu_share) == max(1, cores // 2)
+    finally:
+        cpu_pool.shutdown_cpu_pool()
+
+    assert cpu_pool.cpu_share() == cores
+
+    # lightgbm threads per fold come out of this process's share, not the whole machine
+    monkeypatch.setenv("CPU_SHARE", "4")
+    monkeypatch.setattr(ml_engine, "ML_THREADS_PER_WORKER", 0)
+    assert ml_engine._resolve_parallelism(2, None) == (2, 2)
@@ -0,0 +1,124 @@
+import pytest
+import pandas as pd
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.models import MarketData
+from app.crud import save_market_data, get_market_data
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+def _frame(start, periods):
+    dates = pd.date_range(start, periods=periods, freq="D")
+    return pd.DataFrame({
+        "Open": np.arange(periods, dtype=float),
+        "High": np.arange(periods, dtype=float) + 1,
+        "Low": np.arange(periods, dtype=float) - 1,
+        "Close": np.arange(periods, dtype=float),
+        "Volume": np.arange(periods) * 100,
+        "RSI_14": np.nan,
+        "Regime": "Expansion",
+    }, index=dates)
+
+def test_save_market_data_upserts(db):
+    assert save_market_data(db, _frame("2024-01-01", 10), "^GSPC") == 10
+
+    revised = _frame("2024-01-06", 10)
+    revised["Close"] = 99.0
+    save_market_data(db, revised, "^GSPC")
+
+    rows = get_market_data(db, "^GSPC")
+    assert len(rows) == 15
+    assert rows[0].close == 0.0
+    assert rows[-1].close == 99.0
+    assert rows[5].close == 99.0
+    assert rows[0].rsi_14 is None
+    assert rows[0].sma_200 is None
+    assert rows[3].volume == 300
+
+def test_save_market_data_append_only(db):
+    save_market_data(db, _frame("2024-01-01", 10), "^GSPC")
+
+    extended = _frame("2024-01-01", 12)
+    extended["Close"] = -1.0
+
+    assert save_market_data(db, extended, "^GSPC", append_only=True) == 2
+
+    rows = get_market_data(db, "^GSPC")
+    assert len(rows) == 12
+    assert rows[9].close == 9.0
+    assert rows[10].close == -1.0
+
+def test_save_market_data_keeps_tickers_separate(db):
+    save_market_data(db, _frame("2024-01-01", 5), "^GSPC")
+    save_market_data(db, _frame("2024-01-01", 3), "^IXIC")
+
+    assert len(get_market_data(db, "^GSPC")) == 5
+    assert len(get_market_data(db, "^IXIC")) == 3
+    assert db.query(MarketData).count() == 8
+
+def test_get_market_frame_single_ticker_range(db):
+    from app.crud import get_market_frame
+
+    save_market_data(db, _frame("2024-01-01", 30), "^GSPC")
+    save_market_data(db, _frame("2024-01-01", 30), "^IXIC")
+
+    frame = get_market_frame(db, "^GSPC", start="2024-01-10", end="2024-01-19", columns=["Close", "Volume"])
+
+    assert list(frame.columns) == ["Close", "Volume"]
+    assert len(frame) == 10
+    assert frame.index[0] == pd.Timestamp("2024-01-10")
+    assert frame["Close"].iloc[0] == 9.0
+
+def test_get_market_frame_multiple_tickers(db):
+    from app.crud import get_market_frame
+
+    save_market_data(db, _frame("2024-01-01", 5), "^GSPC")
+    save_market_data(db, _frame("2024-01-01", 3), "^IXIC")
+
+    frame = get_market_frame(db, ["^GSPC", "^IXIC"])
+
+    assert frame.index.names == ["Ticker", "Date"]
+    assert len(frame.loc["^IXIC"]) == 3
+    assert frame["RSI_14"].isnull().all()
+    assert (frame["Regime"] == "Expansion").all()
+
+def test_get_market_frame_uses_composite_index(db):
+    from sqlalchemy import text
+    from app.crud import _market_query
+
+    query, _ = _market_query(["^GSPC"], start="2024-01-01", end="2024-03-31")
+    compiled = query.compile(db.get_bind(), compile_kwargs={"literal_binds": True})
+    plan = db.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).fetchall()
+
+    assert any("ix_market_data_ticker_date" in str(row) for row in plan)
+
+def test_upsert_migrates_database_without_unique_index():
+    from sqlalchemy import text
+
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+
+    # a database from before the unique index, holding a duplicated bar
+    session.execute(text("DROP INDEX ix_market_data_ticker_date"))
+    save_market_data(session, _frame("2024-01-01", 3), "^GSPC", append_only=True)
+    session.execute(text(
+        "INSERT INTO market_data (ticker, date, close) VALUES ('^GSPC', '2024-01-02 00:00:00.000000', 42.0)"
+    ))
+    session.commit()
+
+    revised = _frame("2024-01-03", 2)
+    revised["Close"] = 99.0
+    save_market_data(session, revised, "^GSPC")
+
+    rows = get_market_data(session, "^GSPC")
+    assert [row.close for row in rows] == [0.0, 42.0, 99.0, 99.0]
+    session.close()
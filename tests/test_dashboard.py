@@ -54,3 +54,32 @@ def test_create_dashboard_with_fear_greed():
 
     trace_names = [trace.name for trace in fig.data if trace.name]
     assert "Fear & Greed Proxy" in trace_names
+
+def test_create_dashboard_downsamples_long_series():
+    dates = pd.date_range("2000-01-01", periods=5000)
+    df = pd.DataFrame({
+        "Close": np.cumsum(np.random.randn(5000)) + 1000,
+        "P_Expansion": np.random.rand(5000),
+        "P_Slowdown": np.random.rand(5000),
+        "P_Stress": np.random.rand(5000),
+        "Fear_Greed": np.random.randn(5000) * 30 + 50,
+    }, index=dates)
+    df.iloc[1234, df.columns.get_loc("Fear_Greed")] = 500
+
+    fig = create_dashboard(df, width=400)
+    traces = {trace.name: trace for trace in fig.data if trace.name}
+
+    price = traces["Price"]
+    assert price.type == "scattergl"
+    assert len(price.x) == 400
+
+    # stacked regimes keep a common x axis and stay svg
+    stacked = [traces[name] for name in ("Expansion Prob", "Slowdown Prob", "Stress Prob")]
+    assert all(trace.type == "scatter" for trace in stacked)
+    assert all(list(trace.x) == list(stacked[0].x) for trace in stacked)
+    assert len(stacked[0].x) < 5000
+
+    # min-max keeps the spike, and the thresholds are shapes rather than traces
+    assert max(traces["Fear & Greed Proxy"].y) == 500
+    assert sorted(shape.y0 for shape in fig.layout.shapes) == [20, 80]
+    assert len([trace for trace in fig.data if not trace.name and trace.type != "indicator"]) == 0
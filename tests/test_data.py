@@ -1,4 +1,3 @@
-import pickle
 import pandas as pd
 import pytest
 from unittest.mock import patch, MagicMock
@@ -38,7 +37,7 @@ def mock_response():
     return mock
 
 def test_fetch_data_success(mock_response):
-    with patch("requests.get", return_value=mock_response) as mock_get, \
+    with patch("app.http_client.get", return_value=mock_response) as mock_get, \
          patch("app.data._write_cache") as mock_write_cache, \
          patch("app.data._load_cache", return_value=None):
 
@@ -61,7 +60,7 @@ def test_fetch_data_uses_cache():
     )
 
     with patch("app.data._load_cache", return_value=cached_df) as mock_load_cache, \
-         patch("requests.get") as mock_get:
+         patch("app.http_client.get") as mock_get:
 
         df = fetch_data("^GSPC", "2y")
         assert not df.empty
@@ -69,7 +68,7 @@ def test_fetch_data_uses_cache():
         mock_get.assert_not_called()
 
 def test_fetch_data_failure():
-    with patch("requests.get", side_effect=Exception("Network error")), \
+    with patch("app.http_client.get", side_effect=Exception("Network error")), \
          patch("app.data._load_cache", return_value=None):
 
         with pytest.raises(RuntimeError, match="Data fetch failed"):
@@ -80,8 +79,260 @@ def test_fetch_data_empty_response():
     mock_empty.json.return_value = {"chart": {"result": None, "error": {"code": "Not Found"}}}
     mock_empty.status_code = 404
 
-    with patch("requests.get", return_value=mock_empty), \
+    with patch("app.http_client.get", return_value=mock_empty), \
          patch("app.data._load_cache", return_value=None):
 
         with pytest.raises(RuntimeError, match="Data fetch failed"):
             fetch_data("^GSPC", "2y")
+
+
+@pytest.fixture
+def price_cache(tmp_path, monkeypatch):
+    import app.data as data
+    monkeypatch.setattr(data, "PRICE_CACHE_DIR", tmp_path / "prices")
+    return data
+
+
+def _prices(start="2024-01-01", periods=10):
+    index = pd.date_range(start, periods=periods, freq="D", name="Date")
+    return pd.DataFrame(
+        {
+            "Open": range(periods),
+            "High": range(1, periods + 1),
+            "Low": range(periods),
+            "Close": [100.0 + i for i in range(periods)],
+            "Volume": [1000.0 * i for i in range(periods)],
+        },
+        index=index,
+    ).astype(float)
+
+
+def test_price_cache_round_trip(price_cache):
+    prices = _prices()
+    price_cache._write_cache("^GSPC", "1d", prices)
+
+    loaded = price_cache._load_cache("^GSPC")
+    pd.testing.assert_frame_equal(loaded, prices, check_freq=False, check_index_type=False)
+
+    # no temp files are left behind by the atomic write
+    path = price_cache.cache_path("^GSPC", "1d")
+    assert not [p for p in path.iterdir() if p.suffix == ".tmp"]
+
+
+def test_price_cache_reads_column_and_date_slices(price_cache):
+    prices = _prices()
+    price_cache._write_cache("^GSPC", "1d", prices)
+
+    loaded = price_cache._load_cache("^GSPC", "1d", start=prices.index[6], columns=["Close"])
+
+    assert list(loaded.columns) == ["Close"]
+    assert list(loaded["Close"]) == list(prices["Close"].iloc[6:])
+
+
+def test_price_cache_merges_segments_keeping_latest(price_cache):
+    prices = _prices()
+    price_cache._write_cache("^GSPC", "1d", prices)
+
+    revised = _prices("2024-01-09", periods=4)
+    revised["Close"] = -1.0
+    price_cache._write_segment(price_cache.cache_path("^GSPC", "1d"), revised)
+
+    loaded = price_cache._load_cache("^GSPC")
+
+    assert len(loaded) == 12
+    assert loaded.index.is_monotonic_increasing
+    assert (loaded["Close"].iloc[8:] == -1.0).all()
+    assert list(loaded["Close"].iloc[:8]) == list(prices["Close"].iloc[:8])
+
+
+def test_price_cache_expires_and_evicts(price_cache, monkeypatch):
+    import os
+    from datetime import timedelta
+
+    price_cache._write_cache("AAA", "1d", _prices())
+    segment = price_cache._segment_files(price_cache.cache_path("AAA", "1d"))[0]
+    os.utime(segment, (0, 0))
+    assert price_cache._load_cache("AAA") is None
+    assert price_cache._load_cache("AAA", max_age=timedelta(days=365 * 100)) is not None
+
+    # with a cap of one series, writing a second evicts the least recently read
+    monkeypatch.setattr(price_cache, "PRICE_CACHE_MAX_BYTES", segment.stat().st_size)
+    os.utime(price_cache.cache_path("AAA", "1d"), (0, 0))
+    price_cache._write_cache("BBB", "1d", _prices())
+
+    assert not price_cache.cache_path("AAA", "1d").exists()
+    assert price_cache._load_cache("BBB") is not None
+
+
+def _chart_payload(frame):
+    return {
+        "chart": {
+            "result": [
+                {
+                    "timestamp": [int(ts.timestamp()) for ts in frame.index],
+                    "indicators": {"quote": [{col.lower(): list(frame[col]) for col in frame.columns}]},
+                }
+            ]
+        }
+    }
+
+
+def test_fetch_data_extends_stale_cache(price_cache):
+    import os
+
+    start = pd.Timestamp.now().normalize() - pd.Timedelta(days=12)
+    history = _prices(start, periods=10)
+    price_cache._write_cache("^GSPC", "1d", history, covered_from=start - pd.DateOffset(years=5))
+
+    path = price_cache.cache_path("^GSPC", "1d")
+    os.utime(price_cache._segment_files(path)[0], (0, 0))
+
+    # yahoo resends the last cached bar (revised) plus one new bar
+    delta = _prices(history.index[-1], periods=2)
+    delta["Close"] = [999.0, 1000.0]
+    response = MagicMock(status_code=200)
+    response.json.return_value = _chart_payload(delta)
+
+    with patch("app.http_client.get", return_value=response) as mock_get, patch("app.data.time.sleep"):
+        df = fetch_data("^GSPC", "2y")
+
+    params = mock_get.call_args.kwargs["params"]
+    assert "range" not in params
+    assert params["period1"] == int(history.index[-1].timestamp())
+
+    assert len(df) == 11
+    assert list(df["Close"].iloc[-2:]) == [999.0, 1000.0]
+    assert list(df["Close"].iloc[:9]) == list(history["Close"].iloc[:9])
+
+    # only the delta was written, as a new segment, and the series is fresh again
+    assert len(price_cache._segment_files(path)) == 2
+    pd.testing.assert_frame_equal(price_cache._load_cache("^GSPC"), df, check_freq=False)
+
+
+def test_cache_key_includes_interval(price_cache):
+    daily = _prices()
+    hourly = _prices(periods=3)
+
+    price_cache._write_cache("^GSPC", "1d", daily)
+    price_cache._write_cache("^GSPC", "1h", hourly)
+
+    assert len(price_cache._load_cache("^GSPC", "1d")) == 10
+    assert len(price_cache._load_cache("^GSPC", "1h")) == 3
+
+
+def test_shorter_periods_are_sliced_from_longer_history(price_cache):
+    start = pd.Timestamp.now().normalize() - pd.DateOffset(years=5)
+    history = _prices(start + pd.Timedelta(days=1), periods=5 * 365)
+    response = MagicMock(status_code=200)
+    response.json.return_value = _chart_payload(history)
+
+    with patch("app.http_client.get", return_value=response) as mock_get, patch("app.data.time.sleep"):
+        five_years = fetch_data("^GSPC", "5y")
+        two_years = fetch_data("^GSPC", "2y")
+        one_month = fetch_data("^GSPC", "1mo")
+
+        assert mock_get.call_count == 1
+
+        # a longer span than the store was fetched for still goes to the network
+        fetch_data("^GSPC", "max")
+        assert mock_get.call_count == 2
+        assert mock_get.call_args.kwargs["params"]["range"] == "10y"
+
+    assert len(five_years) == len(history)
+    assert two_years.index[0] >= pd.Timestamp.now() - pd.DateOffset(years=2, days=1)
+    assert two_years.index[-1] == history.index[-1]
+    assert 25 <= len(one_month) <= 32
+    assert len(list(price_cache.PRICE_CACHE_DIR.iterdir())) == 1
+
+
+def test_fetch_since_is_independent_of_stored_history(price_cache):
+    now = pd.Timestamp.now().normalize()
+    history = _prices(now - pd.DateOffset(years=10) + pd.Timedelta(days=1), periods=10 * 365)
+    since = now - pd.DateOffset(years=3)
+
+    def chart(url, params, **kwargs):
+        # yahoo answers each range with just that span
+        response = MagicMock(status_code=200)
+        span = history[history.index >= now - price_cache.PERIOD_OFFSETS[params["range"]]]
+        response.json.return_value = _chart_payload(span)
+        return response
+
+    with patch("app.http_client.get", side_effect=chart) as mock_get:
+        fetched = fetch_data("^GSPC", "2y", since=since)
+        # a longer period fetched by someone else doesn't change the frame
+        fetch_data("^GSPC", "max")
+        again = fetch_data("^GSPC", "2y", since=since)
+
+    assert mock_get.call_args_list[0].kwargs["params"]["range"] == "5y"
+    assert mock_get.call_count == 2
+    assert fetched.index[0] >= since
+    assert fetched.index[0] - since < pd.Timedelta(days=2)
+    pd.testing.assert_frame_equal(fetched, again)
+
+def test_fetch_fails_over_and_honours_retry_after(price_cache):
+    throttled = MagicMock(status_code=429, headers={"Retry-After": "2"})
+    ok = MagicMock(status_code=200)
+    ok.json.return_value = MOCK_YAHOO_JSON
+
+    # query1 throttles, query2 answers: no sleep needed
+    with patch("app.http_client.get", side_effect=[throttled, ok]) as mock_get, \
+         patch("app.data.time.sleep") as mock_sleep:
+        df = fetch_data("^GSPC", "max")
+
+    assert len(df) == 3
+    assert "query1" in mock_get.call_args_list[0].args[0]
+    assert "query2" in mock_get.call_args_list[1].args[0]
+    mock_sleep.assert_not_called()
+
+    # both hosts throttled: back off for Retry-After, then retry
+    with patch("app.http_client.get", side_effect=[throttled, throttled, ok]), \
+         patch("app.data.time.sleep") as mock_sleep:
+        fetch_data("^IXIC", "max")
+
+    mock_sleep.assert_called_once_with(2.0)
+
+
+def test_fetch_stops_at_open_circuit(price_cache):
+    with patch("app.http_client.get", side_effect=Exception("Network error")) as mock_get, \
+         patch("app.data.time.sleep"):
+        with pytest.raises(RuntimeError, match="circuit open"):
+            fetch_data("^GSPC", "2y")
+
+    # three failures per host open both breakers; the fourth attempt doesn't hit the network
+    assert mock_get.call_count == 6
+
+
+def test_fetch_many_runs_concurrently(price_cache):
+    import threading
+    from app.data import fetch_many
+
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_get(url, **kwargs):
+        with lock:
+            active.append(url)
+            peak.append(len(active))
+        # time.sleep is patched out below, so wait on an event instead
+        threading.Event().wait(0.05)
+        with lock:
+            active.remove(url)
+
+        if "BAD" in url:
+            missing = MagicMock(status_code=404)
+            missing.raise_for_status.side_effect = Exception("404 Not Found")
+            return missing
+
+        response = MagicMock(status_code=200)
+        response.json.return_value = MOCK_YAHOO_JSON
+        return response
+
+    tickers = ["AAA", "BBB", "CCC", "DDD", "AAA", "BAD"]
+
+    with patch("app.http_client.get", side_effect=slow_get), patch("app.data.time.sleep"):
+        results = fetch_many(tickers, "max")
+
+    assert list(results) == ["AAA", "BBB", "CCC", "DDD"]
+    assert all(len(df) == 3 for df in results.values())
+    assert max(peak) > 1
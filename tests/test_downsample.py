@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from app.downsample import downsample, lttb_indices, minmax_indices, shared_indices
+
+
+def test_lttb_keeps_endpoints_and_peaks():
+    x = np.arange(1000, dtype=float)
+    y = np.sin(x / 50)
+    y[500] = 10
+
+    picked = lttb_indices(x, y, 100)
+
+    assert len(picked) == 100
+    assert picked[0] == 0 and picked[-1] == 999
+    assert np.all(np.diff(picked) > 0)
+    assert 500 in picked
+
+def test_lttb_passthrough_when_short():
+    assert list(lttb_indices(np.arange(10.0), np.arange(10.0), 50)) == list(range(10))
+
+def test_minmax_keeps_bucket_extremes():
+    y = np.random.randn(10000)
+    y[4321] = 100
+    y[777] = -100
+
+    picked = minmax_indices(y, 200)
+
+    assert len(picked) <= 200
+    assert {0, 777, 4321, 9999} <= set(picked)
+
+def test_minmax_handles_all_nan_buckets():
+    y = np.random.randn(1000)
+    y[100:400] = np.nan
+
+    picked = minmax_indices(y, 50)
+    assert np.all(np.diff(picked) > 0)
+
+def test_downsample_series_and_shared_indices():
+    dates = pd.date_range("2010-01-01", periods=3000)
+    frame = pd.DataFrame(np.random.rand(3000, 3), index=dates, columns=["a", "b", "c"])
+
+    reduced = downsample(frame["a"], 300)
+    assert len(reduced) == 300
+    assert reduced.index.isin(dates).all()
+
+    common = shared_indices(frame, ["a", "b", "c"], 300)
+    assert 300 <= len(common) <= 900
+
+def test_lttb_never_picks_gaps_over_data():
+    # a series far from zero: zero-filled gaps would win every area comparison
+    x = np.arange(2000, dtype=float)
+    y = 5000 + np.sin(x / 40) * 10
+    y[np.arange(2000) % 7 == 3] = np.nan
+
+    picked = lttb_indices(x, y, 200)
+
+    assert not np.isnan(y[picked[1:-1]]).any()
+
+    # a run of gaps longer than a bucket still leaves its first point in place
+    y[500:600] = np.nan
+    picked = lttb_indices(x, y, 200)
+    assert len(picked) == 200
+    assert np.all(np.diff(picked) > 0)
@@ -0,0 +1,65 @@
+import gzip
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from app import http_client
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = json.dumps({"path": self.path, "encoding": self.headers.get("Accept-Encoding")}).encode()
+        if "gzip" in (self.headers.get("Accept-Encoding") or ""):
+            body = gzip.compress(body)
+            self.send_response(200)
+            self.send_header("Content-Encoding", "gzip")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    http_client.close_session()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+    http_client.close_session()
+
+
+def test_session_reuses_connections(server):
+    for i in range(5):
+        response = http_client.get(f"{server}/chart/{i}", params={"range": "2y"})
+        assert response.json()["path"] == f"/chart/{i}?range=2y"
+
+    stats = http_client.get_http_stats()
+    assert stats["requests"] == 5
+    assert stats["connections"] == 1
+    assert stats["reused"] == 4
+    assert stats["hosts"]["127.0.0.1"]["requests"] == 5
+
+
+def test_responses_are_decompressed(server):
+    response = http_client.get(f"{server}/compressed")
+
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "gzip" in response.json()["encoding"]
+
+
+def test_timeouts_are_split_into_connect_and_read():
+    assert http_client._timeout(None) == (http_client.HTTP_CONNECT_TIMEOUT, http_client.HTTP_READ_TIMEOUT)
+    assert http_client._timeout(7) == (http_client.HTTP_CONNECT_TIMEOUT, 7.0)
+    assert http_client._timeout((1.0, 2.0)) == (1.0, 2.0)
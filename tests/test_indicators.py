@@ -46,3 +46,62 @@ def test_add_indicators(mock_market_data):
     ]
     for col in expected_cols:
         assert col in df.columns
+
+def test_add_panel_indicators_matches_per_ticker(mock_market_data):
+    from app.indicators import add_panel_indicators, split_panel
+
+    other = mock_market_data.iloc[40:] * 1.5
+    frames = {"AAA": mock_market_data, "BBB": other}
+
+    panel = add_panel_indicators(frames)
+    assert panel["SMA_50"].shape == (len(mock_market_data), 2)
+
+    split = split_panel(panel)
+    for ticker, frame in frames.items():
+        expected = add_indicators(frame)
+        assert list(split[ticker].columns) == list(expected.columns)
+        assert split[ticker].index.equals(expected.index)
+        assert np.allclose(split[ticker].values.astype(float), expected.values.astype(float), equal_nan=True)
+
+def test_add_panel_indicators_accepts_long_frame(mock_market_data):
+    from app.indicators import add_panel_indicators
+
+    long_frame = pd.concat({"AAA": mock_market_data, "BBB": mock_market_data * 2}, names=["Ticker"])
+    panel = add_panel_indicators(long_frame)
+
+    assert list(panel["RSI_14"].columns) == ["AAA", "BBB"]
+    assert np.allclose(panel["RSI_14"]["AAA"], calculate_rsi(mock_market_data), equal_nan=True)
+
+def test_add_panel_indicators_handles_mid_range_gaps(mock_market_data):
+    from app.indicators import add_panel_indicators, split_panel
+
+    # BBB misses a date in the middle of the shared calendar
+    other = (mock_market_data * 1.5).drop(mock_market_data.index[150])
+    frames = {"AAA": mock_market_data, "BBB": other}
+
+    split = split_panel(add_panel_indicators(frames))
+
+    for ticker, frame in frames.items():
+        expected = add_indicators(frame)
+        assert split[ticker].index.equals(expected.index)
+        assert np.allclose(split[ticker].values.astype(float), expected.values.astype(float), equal_nan=True)
+
+def test_add_panel_indicators_batches_staggered_starts(mock_market_data):
+    from unittest.mock import patch
+    import app.indicators as indicators
+
+    # every ticker starts on a different date, one stops early and one has a gap
+    frames = {f"T{i}": mock_market_data.iloc[i * 15:] * (1 + i / 10) for i in range(4)}
+    frames["END"] = mock_market_data.iloc[:-30]
+    frames["GAP"] = mock_market_data.drop(mock_market_data.index[150])
+
+    with patch("app.indicators._apply_indicators", wraps=indicators._apply_indicators) as apply:
+        split = indicators.split_panel(indicators.add_panel_indicators(frames))
+
+    # the contiguous tickers share one pass, only the gapped one runs alone
+    assert apply.call_count == 2
+
+    for ticker, frame in frames.items():
+        expected = add_indicators(frame)
+        assert split[ticker].index.equals(expected.index)
+        assert np.allclose(split[ticker].values.astype(float), expected.values.astype(float), equal_nan=True)
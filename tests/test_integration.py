@@ -55,3 +55,191 @@ def test_overlay_endpoint(mock_build_overlay, mock_bayes, mock_enrich, mock_indi
     response = client.get("/api/overlay")
     assert response.status_code == 200
     assert response.json() == {"signal": "buy"}
+
+@patch("app.main.fetch_data")
+@patch("app.main.add_indicators")
+@patch("app.main.enrich_macro_data")
+@patch("app.main.compute_bayesian_regime")
+@patch("app.main.run_backtest")
+@patch("app.main.build_overlay_signal")
+def test_repeated_requests_reuse_dataset(mock_build_overlay, mock_backtest, mock_bayes, mock_enrich, mock_indicators, mock_fetch):
+    mock_df = pd.DataFrame({"Close": [100, 101], "Open": [99, 100]}, index=pd.date_range("2021-01-01", periods=2))
+    mock_fetch.return_value = mock_df
+    mock_indicators.return_value = mock_df
+    mock_enrich.return_value = mock_df
+    mock_bayes.return_value = pd.DataFrame({"P_Expansion": [0.5, 0.5]}, index=mock_df.index)
+    mock_backtest.return_value = mock_df
+    mock_build_overlay.return_value = {"signal": "buy"}
+
+    for _ in range(3):
+        assert client.get("/api/overlay").status_code == 200
+
+    assert mock_backtest.call_count == 1
+
+    # new price data means a new dataset version
+    mock_fetch.return_value = mock_df.assign(Close=[100, 105])
+    assert client.get("/api/overlay").status_code == 200
+    assert mock_backtest.call_count == 2
+
+    stats = client.get("/api/cache/stats").json()["datasets"]
+    assert stats["hits"] == 2
+    assert stats["misses"] == 2
+    assert stats["entries"] == 1
+
+def test_overlay_served_from_warm_result():
+    from app import main
+
+    with patch.object(main.scheduler, "build", return_value=("dataset", {"signal": "warm"})):
+        main.scheduler.refresh_pair(("^GSPC", "2y"))
+
+    with patch("app.main.build_market_dataset") as mock_build:
+        response = client.get("/api/overlay")
+
+    assert response.json() == {"signal": "warm"}
+    mock_build.assert_not_called()
+
+@patch("app.main.fetch_data")
+@patch("app.main.add_indicators")
+@patch("app.main.enrich_macro_data")
+@patch("app.main.compute_bayesian_regime")
+@patch("app.main.run_backtest")
+@patch("app.main.get_live_quotes")
+@patch("app.main.create_dashboard")
+def test_dashboard_cached_compressed_and_conditional(mock_create_dashboard, mock_quotes, mock_backtest, mock_bayes, mock_enrich, mock_indicators, mock_fetch):
+    mock_df = pd.DataFrame({"Close": [100, 101], "Open": [99, 100]}, index=pd.date_range("2021-01-01", periods=2))
+    mock_fetch.return_value = mock_df
+    mock_indicators.return_value = mock_df
+    mock_enrich.return_value = mock_df
+    mock_bayes.return_value = pd.DataFrame({"P_Expansion": [0.5, 0.5]}, index=mock_df.index)
+    mock_backtest.side_effect = lambda df, **kwargs: df.copy()
+    # each fetch stamps a new time, as the live quote service does
+    mock_quotes.side_effect = lambda symbols: [
+        {"price": 1.0, "change": 0.0, "pct_change": 0.0, "timestamp": pd.Timestamp.now()} for _ in symbols
+    ]
+
+    mock_fig = MagicMock()
+    mock_fig.to_json.return_value = '{"data": [], "layout": {"title": "' + "x" * 4000 + '</script>"}}'
+    mock_create_dashboard.return_value = mock_fig
+
+    first = client.get("/", headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert "marketWatch by @joshmode" in first.text
+    assert "<\\/script>" in first.text
+    etag = first.headers["etag"]
+
+    raw = client.get("/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in raw.headers
+    assert raw.headers["etag"] == etag
+    # the client decodes gzip transparently
+    assert raw.content == first.content
+
+    # unchanged inputs: served from the page cache, and a revalidation gets a 304
+    assert mock_create_dashboard.call_count == 1
+    revalidated = client.get("/", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert client.get("/", headers={"If-Modified-Since": first.headers["last-modified"]}).status_code == 304
+
+    # a new dataset version renders a new page with a new etag
+    mock_fetch.return_value = mock_df.assign(Close=[100, 105])
+    changed = client.get("/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert mock_create_dashboard.call_count == 2
+
+@patch("app.main.build_market_dataset")
+@patch("app.main.create_dashboard")
+def test_dashboard_sizes_chart_to_viewport(mock_create_dashboard, mock_build):
+    mock_df = pd.DataFrame({"Close": [100, 101]}, index=pd.date_range("2021-01-01", periods=2))
+    mock_build.return_value = mock_df
+    mock_fig = MagicMock()
+    mock_fig.to_json.return_value = "{}"
+    mock_create_dashboard.return_value = mock_fig
+
+    with patch("app.main.get_live_quotes", return_value=[]):
+        # no width sent: the chart is rendered at the default width straight away
+        first = client.get("/")
+        assert first.status_code == 200
+        assert "Plotly.newPlot" in first.text
+        assert mock_create_dashboard.call_args.kwargs["width"] == 1200
+
+        # the page asks again only when its chart column rounds to another width
+        assert "width !== 1200" in first.text
+
+        page = client.get("/?width=1640")
+
+    assert page.status_code == 200
+    assert "width !== 1600" in page.text
+    # rounded so nearby viewports share a render
+    assert mock_create_dashboard.call_args.kwargs["width"] == 1600
+
+def _daily_history(n_rows, seed=7):
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(end=pd.Timestamp.now().normalize(), periods=n_rows, name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n_rows)))
+    return pd.DataFrame({
+        "Open": close,
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Close": close,
+        "Volume": rng.integers(100, 1000, n_rows).astype(float),
+    }, index=index)
+
+def test_pipeline_resumes_regime_filter_as_window_slides(tmp_path, monkeypatch):
+    import app.bayesian_regime as bayesian_regime
+    from app import main
+
+    from app.macro import SERIES
+
+    monkeypatch.setattr(bayesian_regime, "STATE_DIR", tmp_path)
+    history = _daily_history(1200)
+
+    rng = np.random.default_rng(1)
+    macro_index = pd.date_range(history.index[0] - pd.Timedelta(days=400), history.index[-1])
+    macro = pd.DataFrame(
+        np.cumsum(rng.normal(size=(len(macro_index), len(SERIES))), axis=0) + 50,
+        index=macro_index, columns=list(SERIES),
+    )
+
+    filtered = []
+    original = bayesian_regime._run_filter
+
+    def counting_filter(log_likelihoods, prior):
+        filtered.append(len(log_likelihoods))
+        return original(log_likelihoods, prior)
+
+    no_ml = lambda df, ticker=None: pd.Series(0.0, index=df.index)
+
+    # a period start whose anchor stays put when it moves on a bar, as on most days
+    first = next(i for i in range(1050, 0, -1)
+                 if main.history_anchor(history.index[i]) == main.history_anchor(history.index[i + 1]))
+    anchor = main.history_anchor(history.index[first])
+    stored = {}
+
+    with patch("app.main.fetch_data", side_effect=lambda ticker, period, since=None: stored["prices"].loc[since:]) as mock_fetch, \
+         patch("app.main.period_start") as mock_start, \
+         patch("app.main.load_macro_data", return_value=macro), \
+         patch("app.backtest.get_historical_predictions", side_effect=no_ml), \
+         patch.object(bayesian_regime, "_run_filter", counting_filter):
+        # yesterday: the store ends a bar earlier and the 2y window starts a bar earlier
+        stored["prices"] = history.iloc[:-1]
+        mock_start.return_value = history.index[first]
+        yesterday = main.build_market_dataset("^TEST", "2y")
+
+        stored["prices"] = history
+        mock_start.return_value = history.index[first + 1]
+        today = main.build_market_dataset("^TEST", "2y")
+
+    assert mock_fetch.call_args.kwargs["since"] == anchor
+    assert bayesian_regime.regime_state_path(f"^TEST_{anchor:%Y%m%d}").exists()
+    computed = len(history.loc[anchor:])
+    # the window dropped its first bar and gained one, yet only the new bar went through the filter
+    assert filtered == [computed - 1, 1]
+    assert today.index[0] == history.index[first + 1] and yesterday.index[0] == history.index[first]
+    assert today.index[-1] == history.index[-1]
+    pd.testing.assert_frame_equal(
+        today.loc[yesterday.index[1]:, ["P_Expansion", "P_Slowdown", "P_Stress"]].iloc[:-1],
+        yesterday.loc[yesterday.index[1]:, ["P_Expansion", "P_Slowdown", "P_Stress"]],
+    )
@@ -0,0 +1,124 @@
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app import live_quotes
+from app.singleflight import SingleFlight
+
+
+@pytest.fixture(autouse=True)
+def fresh_quotes():
+    live_quotes.clear_live_quotes()
+    yield
+    live_quotes.clear_live_quotes()
+
+
+def _quote(symbol, price):
+    return {"symbol": symbol, "price": price, "change": 0.0, "pct_change": 0.0, "timestamp": "now"}
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        release.wait(1)
+        return 42
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(8)]
+    for t in threads:
+        t.start()
+
+    time.sleep(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results == [42] * 8
+    assert len(calls) == 1
+    assert not flight.in_flight("k")
+
+
+def test_concurrent_viewers_share_one_fetch_per_symbol():
+    calls = []
+    lock = threading.Lock()
+
+    def fetch(symbol):
+        with lock:
+            calls.append(symbol)
+        threading.Event().wait(0.05)
+        return _quote(symbol, 100.0)
+
+    symbols = ["^GSPC", "^IXIC", "^VIX"]
+    results = []
+
+    with patch("app.live_quotes.fetch_live_quote", side_effect=fetch):
+        threads = [threading.Thread(target=lambda: results.append(live_quotes.get_live_quotes(symbols))) for _ in range(10)]
+        start = time.monotonic()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.monotonic() - start
+
+        # within the ttl, no further upstream calls
+        live_quotes.get_live_quotes(symbols)
+
+    assert sorted(calls) == sorted(symbols)
+    assert all([q["symbol"] for q in r] == symbols for r in results)
+    # symbols fetched in parallel, not one after another
+    assert elapsed < 0.12
+
+
+def test_stale_quote_is_served_while_refreshing(monkeypatch):
+    refreshed = threading.Event()
+
+    def fetch(symbol):
+        price = 100.0 if not calls else 101.0
+        calls.append(symbol)
+        if price == 101.0:
+            refreshed.set()
+        return _quote(symbol, price)
+
+    calls = []
+    monkeypatch.setattr(live_quotes, "LIVE_QUOTE_TTL", 0.0)
+
+    with patch("app.live_quotes.fetch_live_quote", side_effect=fetch):
+        assert live_quotes.get_live_quotes(["^VIX"])[0]["price"] == 100.0
+
+        time.sleep(0.01)
+        # expired: the old quote comes back immediately, the refresh lands afterwards
+        assert live_quotes.get_live_quotes(["^VIX"])[0]["price"] == 100.0
+        assert refreshed.wait(1)
+
+        monkeypatch.setattr(live_quotes, "LIVE_QUOTE_TTL", 60.0)
+        assert live_quotes.get_live_quotes(["^VIX"])[0]["price"] == 101.0
+
+
+def test_failed_fetches_keep_last_good_quote(monkeypatch):
+    with patch("app.live_quotes.fetch_live_quote", return_value=None):
+        quote = live_quotes.get_live_quotes(["^GSPC"])[0]
+    assert quote["symbol"] == "^GSPC"
+    assert quote["price"] == 0.0
+
+    with patch("app.live_quotes.fetch_live_quote", return_value=_quote("^GSPC", 5000.0)):
+        live_quotes.get_live_quotes(["^GSPC"])
+
+    monkeypatch.setattr(live_quotes, "LIVE_QUOTE_TTL", 0.0)
+    with patch("app.live_quotes.fetch_live_quote", return_value=None):
+        live_quotes.get_live_quotes(["^GSPC"])
+        time.sleep(0.05)
+        quote = live_quotes.get_live_quotes(["^GSPC"])[0]
+        time.sleep(0.05)
+
+    assert quote["price"] == 5000.0
+
+    # callers get copies
+    quote["symbol"] = "S&P 500"
+    monkeypatch.setattr(live_quotes, "LIVE_QUOTE_TTL", 60.0)
+    assert live_quotes.get_live_quotes(["^GSPC"])[0]["symbol"] == "^GSPC"
@@ -35,3 +35,138 @@ def test_enrich_macro_data(mock_fetch_series, mock_market_data):
     ]
     for col in expected_cols:
         assert col in enriched.columns
+
+@patch("app.macro.FRED_API_KEY", "fake_key")
+def test_load_macro_data_fetches_concurrently(mock_fetch_series):
+    import threading
+    import time
+    from app.macro import SERIES, get_macro_fetch_stats
+
+    series = pd.Series(np.random.rand(50), index=pd.date_range("2020-01-01", periods=50))
+
+    def slow_fetch(series_id, max_age):
+        threading.Event().wait(0.05)
+        return series
+
+    mock_fetch_series.side_effect = slow_fetch
+
+    start = time.monotonic()
+    df = load_macro_data()
+    elapsed = time.monotonic() - start
+
+    assert set(df.columns) == set(SERIES)
+    # 11 series at 50ms each would take 0.55s one after another
+    assert elapsed < 0.4
+
+    stats = get_macro_fetch_stats()
+    for code in SERIES.values():
+        assert stats[code]["status"] == "ok"
+        assert stats[code]["seconds"] >= 0.04
+        assert stats[code]["observations"] == 50
+
+@patch("app.macro.FRED_API_KEY", "fake_key")
+def test_load_macro_data_degrades_missing_series(mock_fetch_series, monkeypatch):
+    import threading
+    from app import macro
+
+    monkeypatch.setattr(macro, "FRED_LOAD_TIMEOUT", 0.3)
+    series = pd.Series(np.random.rand(50), index=pd.date_range("2020-01-01", periods=50))
+    release = threading.Event()
+
+    def fetch(series_id, max_age):
+        if series_id == macro.SERIES["credit"]:
+            raise RuntimeError("boom")
+        if series_id == macro.SERIES["dollar"]:
+            release.wait(2)
+        return series
+
+    mock_fetch_series.side_effect = fetch
+
+    try:
+        df = load_macro_data()
+    finally:
+        release.set()
+
+    assert df["credit"].isna().all()
+    assert df["dollar"].isna().all()
+    assert df["growth"].notna().all()
+
+    stats = macro.get_macro_fetch_stats()
+    assert stats[macro.SERIES["credit"]]["status"] == "error"
+
+@pytest.fixture
+def fred_store(tmp_path, monkeypatch):
+    from app import macro
+
+    monkeypatch.setattr(macro, "FRED_STORE_DIR", tmp_path / "fred")
+    monkeypatch.setattr(macro, "FRED_API_KEY", "fake_key")
+    monkeypatch.setattr(macro, "FRED_REVISION_WINDOW", macro.FRED_REVISION_WINDOW)
+    macro._cache.clear()
+    macro._cache_refreshed.clear()
+    yield macro
+    macro._cache.clear()
+    macro._cache_refreshed.clear()
+
+def _observations(dates, values):
+    response = MagicMock(status_code=200)
+    response.json.return_value = {
+        "observations": [{"date": d, "value": v} for d, v in zip(dates, values)]
+    }
+    return response
+
+def test_fred_store_refreshes_incrementally(fred_store):
+    from datetime import timedelta
+
+    full = _observations(["2024-01-01", "2024-02-01", "2024-03-01"], ["1.0", "2.0", "."])
+    with patch("app.macro.http_client.get", return_value=full) as mock_get:
+        series = fred_store._fetch_series("UNRATE")
+
+    assert "observation_start" not in mock_get.call_args.kwargs["params"]
+    assert list(series.iloc[:2]) == [1.0, 2.0]
+    assert np.isnan(series.iloc[2])
+    assert fred_store.series_store_path("UNRATE").exists()
+
+    # a cold process reads the store instead of the network
+    fred_store._cache.clear()
+    with patch("app.macro.http_client.get") as mock_get:
+        stored = fred_store._fetch_series("UNRATE")
+    mock_get.assert_not_called()
+    pd.testing.assert_series_equal(stored, series, check_names=False, check_index_type=False)
+
+    # once stale, only the trailing window is re-requested and merged in, revisions included
+    fred_store.FRED_REVISION_WINDOW = pd.DateOffset(days=31)
+    revised = _observations(["2024-02-01", "2024-03-01", "2024-04-01"], ["2.5", "3.0", "4.0"])
+    with patch("app.macro.http_client.get", return_value=revised) as mock_get:
+        refreshed = fred_store._fetch_series("UNRATE", max_age=timedelta(0))
+
+    start = pd.Timestamp(mock_get.call_args.kwargs["params"]["observation_start"])
+    assert start == pd.Timestamp("2024-01-30")
+    assert list(refreshed) == [1.0, 2.5, 3.0, 4.0]
+
+    # the refresh fails: the stored observations are still served
+    fred_store._cache.clear()
+    with patch("app.macro.http_client.get", side_effect=Exception("down")):
+        fallback = fred_store._fetch_series("UNRATE", max_age=timedelta(0))
+    assert list(fallback) == [1.0, 2.5, 3.0, 4.0]
+
+@patch("app.macro.FRED_API_KEY", "fake_key")
+def test_enrich_macro_data_shares_layer_per_calendar(mock_fetch_series, mock_market_data):
+    from app import macro
+
+    mock_fetch_series.return_value = pd.Series(np.random.rand(300), index=pd.date_range("2020-01-01", periods=300))
+    other_ticker = mock_market_data * 2
+
+    with patch("app.macro.rolling_zscore", wraps=macro.rolling_zscore) as zscore:
+        first = enrich_macro_data(mock_market_data)
+        second = enrich_macro_data(other_ticker)
+        shorter = enrich_macro_data(mock_market_data.iloc[:200])
+
+    # one layer per calendar, whatever the ticker
+    assert zscore.call_count == 2
+
+    macro_cols = [c for c in first.columns if c not in mock_market_data.columns]
+    pd.testing.assert_frame_equal(first[macro_cols], second[macro_cols])
+
+    reference = mock_market_data.join(macro._build_macro_layer(macro.load_macro_data(), mock_market_data.index))
+    pd.testing.assert_frame_equal(first, reference.ffill().fillna(0))
+    assert len(shorter) == 200
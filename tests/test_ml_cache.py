@@ -0,0 +1,113 @@
+import pytest
+import pandas as pd
+import numpy as np
+from unittest.mock import patch
+import app.ml_engine as ml_engine
+from app.indicators import add_indicators
+
+@pytest.fixture
+def fold_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ml_engine, "FOLD_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(ml_engine, "_fold_cache", {})
+    return tmp_path
+
+@pytest.fixture
+def long_market_data():
+    rng = np.random.default_rng(11)
+    dates = pd.date_range(start="2015-01-01", periods=1200, freq="D")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 1200)))
+    df = pd.DataFrame({
+        "Open": close,
+        "High": close * 1.01,
+        "Low": close * 0.99,
+        "Close": close,
+        "Volume": rng.integers(100, 1000, 1200)
+    }, index=dates)
+    return add_indicators(df)
+
+def _count_fits():
+    original = ml_engine.lgb.train
+    calls = []
+
+    def counting_train(*args, **kwargs):
+        calls.append(1)
+        return original(*args, **kwargs)
+
+    return calls, patch.object(ml_engine.lgb, "train", counting_train)
+
+def test_fold_cache_reuses_predictions(fold_cache_dir, long_market_data):
+    first = ml_engine.get_historical_predictions(long_market_data, ticker="^TEST")
+    assert list(fold_cache_dir.glob("*.joblib"))
+
+    # a fresh process only has the on-disk cache
+    ml_engine._fold_cache.clear()
+
+    calls, patcher = _count_fits()
+    with patcher:
+        second = ml_engine.get_historical_predictions(long_market_data, ticker="^TEST")
+
+    assert not calls
+    pd.testing.assert_series_equal(first, second)
+
+def test_fold_cache_trains_only_new_folds(fold_cache_dir, long_market_data):
+    shorter = ml_engine.get_historical_predictions(long_market_data.iloc[:-70], ticker="^TEST")
+
+    calls, patcher = _count_fits()
+    with patcher:
+        extended = ml_engine.get_historical_predictions(long_market_data, ticker="^TEST")
+
+    assert len(calls) == 1
+
+    # earlier folds come straight from the cache, the new fold fills in the appended rows
+    scored = shorter[shorter != 0].index
+    pd.testing.assert_series_equal(extended.loc[scored], shorter.loc[scored])
+    assert (extended != 0).sum() > len(scored)
+
+def test_parallel_folds_match_serial(long_market_data):
+    serial = ml_engine.get_historical_predictions(long_market_data, n_workers=1, n_threads=1)
+    parallel = ml_engine.get_historical_predictions(long_market_data, n_workers=2, n_threads=1)
+
+    pd.testing.assert_series_equal(serial, parallel)
+    assert (serial != 0).any()
+
+def test_folds_only_see_their_own_past(long_market_data):
+    baseline = ml_engine.get_historical_predictions(long_market_data, n_workers=1, n_threads=1)
+
+    # rewriting the last quarter's features must not move any earlier fold's predictions
+    altered = long_market_data.copy()
+    altered.iloc[-90:, altered.columns.get_loc("RSI_14")] *= 3
+    rerun = ml_engine.get_historical_predictions(altered, n_workers=1, n_threads=1)
+
+    earlier = baseline.index[baseline.index < altered.index[-90]]
+    assert (baseline.loc[earlier] != 0).any()
+    pd.testing.assert_series_equal(rerun.loc[earlier], baseline.loc[earlier])
+
+def test_walk_forward_folds_are_anchored_to_dates(long_market_data):
+    index = long_market_data.index
+
+    def fold_dates(idx):
+        return {(idx[tr[0]], idx[tr[-1]], idx[te[0]], idx[te[-1]]) for tr, te in ml_engine.walk_forward_folds(idx)}
+
+    before = fold_dates(index[:-1])
+    after = fold_dates(index[1:])
+
+    # dropping the first bar only loses the fold whose training window began there
+    assert len(before - after) <= 1
+    assert len(before & after) >= len(before) - 1
+    for _, _, test_start, test_end in before:
+        assert test_start.quarter == test_end.quarter
+
+def test_fold_cache_survives_sliding_window(fold_cache_dir, long_market_data):
+    yesterday = ml_engine.get_historical_predictions(long_market_data.iloc[:-1], ticker="^TEST")
+
+    # the window drops its first row and gains one
+    calls, patcher = _count_fits()
+    with patcher:
+        today = ml_engine.get_historical_predictions(long_market_data.iloc[1:], ticker="^TEST")
+
+    # no quarter closed in between, so every fold is served from the cache
+    assert not calls
+
+    scored = yesterday[yesterday != 0].index.intersection(today[today != 0].index)
+    assert len(scored) > 0
+    pd.testing.assert_series_equal(today.loc[scored], yesterday.loc[scored])
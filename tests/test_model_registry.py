@@ -0,0 +1,43 @@
+from unittest.mock import patch
+import app.model_registry as model_registry
+from app.model_registry import publish_model, load_model
+
+FEATURES = ["RSI_14_Z", "ATR_14_Z"]
+
+def test_publish_and_load_model():
+    assert load_model("^GSPC", FEATURES) is None
+
+    publish_model("^GSPC", FEATURES, {"weights": [1, 2, 3]})
+    assert load_model("^GSPC", FEATURES) == {"weights": [1, 2, 3]}
+
+    # other schemas and tickers don't see it
+    assert load_model("^GSPC", FEATURES + ["MACD_Z"]) is None
+    assert load_model("^IXIC", FEATURES) is None
+
+def test_loaded_model_is_reused_until_a_new_version_is_published():
+    publish_model("^GSPC", FEATURES, {"version": 1})
+    first = load_model("^GSPC", FEATURES)
+
+    with patch("app.model_registry.joblib.load") as mock_load:
+        assert load_model("^GSPC", FEATURES) is first
+        mock_load.assert_not_called()
+
+    publish_model("^GSPC", FEATURES, {"version": 2})
+    assert load_model("^GSPC", FEATURES) == {"version": 2}
+
+def test_old_versions_are_pruned():
+    for version in range(5):
+        publish_model("^GSPC", FEATURES, {"version": version})
+
+    directory = model_registry.model_dir("^GSPC", FEATURES)
+    assert len(list(directory.glob("v*.joblib"))) == model_registry.MODEL_VERSIONS_KEPT
+    assert load_model("^GSPC", FEATURES) == {"version": 4}
+
+def test_loaded_models_are_bounded(monkeypatch):
+    monkeypatch.setattr(model_registry, "MODEL_CACHE_SIZE", 2)
+
+    for ticker in ["A", "B", "C"]:
+        publish_model(ticker, FEATURES, ticker)
+        load_model(ticker, FEATURES)
+
+    assert [key[0] for key in model_registry._loaded] == ["B", "C"]
@@ -0,0 +1,67 @@
+import threading
+import time
+
+from app.rate_limit import CircuitBreaker, TokenBucket
+
+
+def test_token_bucket_allows_burst_then_paces():
+    bucket = TokenBucket(rate=50, capacity=5)
+
+    start = time.monotonic()
+    for _ in range(5):
+        assert bucket.acquire()
+    assert time.monotonic() - start < 0.05
+
+    # the next five have to wait for refills at 50/s
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.08
+
+    empty = TokenBucket(rate=1, capacity=1)
+    empty.acquire()
+    assert not empty.acquire(timeout=0.01)
+
+
+def test_token_bucket_is_shared_across_threads():
+    bucket = TokenBucket(rate=100, capacity=1)
+    taken = []
+
+    def worker():
+        for _ in range(5):
+            bucket.acquire()
+            taken.append(time.monotonic())
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # 20 tokens at 100/s with a burst of 1 can't finish much faster than 0.19s
+    assert len(taken) == 20
+    assert max(taken) - start >= 0.15
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    # only one trial request while half-open
+    assert not breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow()
@@ -0,0 +1,39 @@
+import gzip
+
+from app.rendering import build_page, choose_encoding, not_modified, render_dashboard_page
+
+
+def test_render_dashboard_page_escapes_summary():
+    html = render_dashboard_page('{"data": []}', {"growth": {"value": "<b>1</b>", "date": "2024-01-01"}})
+
+    assert "var chart = {\"data\": []};" in html
+    assert "&lt;b&gt;1&lt;/b&gt;" in html
+
+def test_build_page_precompresses_large_bodies():
+    page = build_page("a" * 5000, 'W/"v1"')
+    assert gzip.decompress(page["gzip"]) == page["identity"]
+
+    small = build_page("tiny", 'W/"v2"')
+    assert "gzip" not in small
+    assert choose_encoding("gzip", small) == "identity"
+
+def test_choose_encoding_respects_quality():
+    page = build_page("a" * 5000, 'W/"v1"')
+
+    assert choose_encoding("gzip, deflate", page) == "gzip"
+    assert choose_encoding("gzip;q=0", page) == "identity"
+    assert choose_encoding(None, page) == "identity"
+    assert choose_encoding("*", page) in ("br", "gzip")
+
+def test_not_modified():
+    page = build_page("a", 'W/"abc"')
+
+    assert not_modified(page, '"abc"', None)
+    assert not_modified(page, 'W/"other", W/"abc"', None)
+    assert not_modified(page, "*", None)
+    assert not not_modified(page, 'W/"other"', None)
+    # if-none-match takes precedence over the date
+    assert not not_modified(page, 'W/"other"', "Tue, 01 Jan 2999 00:00:00 GMT")
+    assert not_modified(page, None, "Tue, 01 Jan 2999 00:00:00 GMT")
+    assert not not_modified(page, None, "Tue, 01 Jan 2000 00:00:00 GMT")
+    assert not not_modified(page, None, "garbage")
@@ -0,0 +1,77 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from app.result_cache import ResultCache
+
+
+def _frame(rows):
+    return pd.DataFrame({"Close": np.arange(rows, dtype=float)})
+
+
+def test_result_cache_hits_and_replaces_versions():
+    cache = ResultCache(max_entries=10, max_bytes=10 ** 9)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    assert cache.get_or_compute("^GSPC", "v1", lambda: compute(1)) == 1
+    assert cache.get_or_compute("^GSPC", "v1", lambda: compute(2)) == 1
+
+    # new input version: recomputed, and the old version is dropped
+    assert cache.get_or_compute("^GSPC", "v2", lambda: compute(3)) == 3
+    assert calls == [1, 3]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 2, 1)
+
+
+def test_result_cache_is_bounded_by_bytes_and_entries():
+    cache = ResultCache(max_entries=3, max_bytes=_frame(100).memory_usage().sum() * 2)
+
+    for ticker in ["A", "B", "C"]:
+        cache.get_or_compute(ticker, "v", lambda: _frame(100))
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    for ticker in ["D", "E", "F", "G"]:
+        cache.get_or_compute(ticker, "v", lambda: "small")
+
+    assert cache.stats()["entries"] == 3
+
+
+def test_result_cache_coalesces_concurrent_misses():
+    cache = ResultCache(max_entries=10, max_bytes=10 ** 9)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(1)
+        return "dataset"
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute("^GSPC", "v1", compute)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+
+    while cache.stats()["in_flight"] == 0:
+        pass
+    threading.Event().wait(0.05)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert results == ["dataset"] * 8
+    assert len(calls) == 1
+
+    stats = cache.stats()
+    assert stats["in_flight"] == 0
+    assert stats["coalesced"] + stats["hits"] == 7
@@ -0,0 +1,78 @@
+import pandas as pd
+import numpy as np
+from app.rolling import rolling_mean_std, rolling_stats, rolling_zscore
+
+def _sample_frame():
+    rng = np.random.default_rng(5)
+    n = 600
+    df = pd.DataFrame({
+        "level": 3000 + np.cumsum(rng.normal(0, 15, n)),
+        "returns": rng.normal(0, 0.01, n),
+        "gappy": np.where(rng.random(n) < 0.05, np.nan, rng.normal(size=n)),
+    }, index=pd.date_range("2020-01-01", periods=n, freq="D"))
+    df.iloc[:40, 0] = np.nan
+    return df
+
+def test_rolling_stats_matches_pandas():
+    df = _sample_frame()
+
+    for window in (20, 50, 252):
+        mean, std = rolling_stats(df, window)
+        assert np.allclose(mean, df.rolling(window).mean(), equal_nan=True, rtol=1e-9)
+        assert np.allclose(std, df.rolling(window).std(), equal_nan=True, rtol=1e-7)
+
+def test_rolling_zscore_matches_pandas_for_series():
+    series = _sample_frame()["level"]
+    expected = (series - series.rolling(50).mean()) / series.rolling(50).std()
+
+    z = rolling_zscore(series, 50)
+    assert isinstance(z, pd.Series)
+    assert z.name == "level"
+    assert np.allclose(z, expected, equal_nan=True, rtol=1e-7, atol=1e-9)
+
+def test_rolling_mean_std_flat_window_and_short_input():
+    mean, std = rolling_mean_std(np.array([1.0, 2.0, 5.0, 5.0, 5.0]), 3)
+    assert mean[-1] == 5.0
+    assert std[-1] == 0.0
+    assert np.isnan(mean[:2]).all()
+
+    mean, std = rolling_mean_std(np.arange(3.0), 10)
+    assert np.isnan(mean).all() and np.isnan(std).all()
+
+def test_rolling_results_unchanged_by_appended_rows():
+    df = _sample_frame()
+
+    head_mean, head_std = rolling_mean_std(df.iloc[:400].to_numpy(), 50)
+    full_mean, full_std = rolling_mean_std(df.to_numpy(), 50)
+
+    # bit-for-bit, so digests of derived series stay valid as history grows
+    assert np.array_equal(head_mean, full_mean[:400], equal_nan=True)
+    assert np.array_equal(head_std, full_std[:400], equal_nan=True)
+
+def test_rolling_stats_recover_after_infinite_values():
+    df = _sample_frame()[["returns"]]
+    df.iloc[[5, 30], 0] = np.inf
+
+    mean, std = rolling_stats(df, 20)
+
+    # only the windows holding an inf are lost, as with pandas
+    clean = df.index[50:]
+    assert np.allclose(mean.loc[clean], df.rolling(20).mean().loc[clean], rtol=1e-9)
+    assert np.allclose(std.loc[clean], df.rolling(20).std().loc[clean], rtol=1e-7)
+    assert mean.iloc[30:50].isna().all().all()
+    assert mean.iloc[25:30].notna().all().all()
+
+def test_rolling_stats_stay_accurate_on_drifting_series():
+    rng = np.random.default_rng(11)
+    # ten years of a stock falling from 500 to about 1.5, then a long quiet stretch
+    falling = 500 * np.exp(np.cumsum(rng.normal(-0.0023, 0.01, 2520)))
+    quiet = falling[-1] + rng.normal(0, 1e-4, 500)
+    values = np.concatenate([falling, quiet])
+
+    for window in (20, 50):
+        mean, std = rolling_mean_std(values, window)
+
+        # exact two-pass reference per window
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)
+        assert np.allclose(mean[window - 1:], windows.mean(axis=1), rtol=1e-12)
+        assert np.allclose(std[window - 1:], windows.std(axis=1, ddof=1), rtol=1e-7, atol=0)
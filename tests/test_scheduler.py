@@ -0,0 +1,103 @@
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from app.scheduler import MARKET_TZ, PrecomputeScheduler, last_refresh, next_refresh, parse_watchlist
+
+
+def test_parse_watchlist():
+    assert parse_watchlist("^GSPC:2y, AAPL ,^IXIC:5y,,^GSPC:2y") == [("^GSPC", "2y"), ("AAPL", "2y"), ("^IXIC", "5y")]
+    assert parse_watchlist(None) == []
+
+
+def test_refresh_times_follow_the_new_york_close():
+    friday_evening = datetime(2024, 3, 8, 17, 0, tzinfo=MARKET_TZ)
+    assert next_refresh(friday_evening) == datetime(2024, 3, 11, 16, 15, tzinfo=MARKET_TZ)
+    assert last_refresh(friday_evening) == datetime(2024, 3, 8, 16, 15, tzinfo=MARKET_TZ)
+
+    # across the DST switch (10 March 2024) the refresh stays at 16:15 local time
+    monday = next_refresh(friday_evening)
+    assert monday.utcoffset() == timedelta(hours=-4)
+    assert friday_evening.utcoffset() == timedelta(hours=-5)
+
+    sunday_in_utc = datetime(2024, 3, 10, 12, 0, tzinfo=MARKET_TZ).astimezone(timezone.utc)
+    assert last_refresh(sunday_in_utc) == datetime(2024, 3, 8, 16, 15, tzinfo=MARKET_TZ)
+
+    wednesday_morning = datetime(2024, 3, 13, 9, 30, tzinfo=MARKET_TZ)
+    assert next_refresh(wednesday_morning) == datetime(2024, 3, 13, 16, 15, tzinfo=MARKET_TZ)
+
+
+@pytest.fixture
+def no_network():
+    with patch("app.scheduler.fetch_data") as fetch, patch("app.scheduler.load_macro_data") as macro:
+        yield fetch, macro
+
+
+def test_refresh_all_warms_every_pair(no_network):
+    fetch, macro = no_network
+    build = MagicMock(side_effect=lambda ticker, period: (f"{ticker}-{period}", {"ticker": ticker}))
+    scheduler = PrecomputeScheduler(build, [("^GSPC", "2y"), ("AAPL", "5y")])
+
+    scheduler.refresh_all(force=True)
+
+    assert scheduler.get("^GSPC", "2y")["dataset"] == "^GSPC-2y"
+    assert scheduler.get("AAPL", "5y")["overlay"] == {"ticker": "AAPL"}
+    assert scheduler.get("MSFT", "2y") is None
+
+    # forced refreshes pull the latest bars and macro first
+    macro.assert_called_once_with(max_age=timedelta(0))
+    assert fetch.call_count == 2
+
+
+def test_stale_entry_is_served_while_rebuilt(no_network):
+    rebuilt = threading.Event()
+    builds = []
+
+    def build(ticker, period):
+        builds.append(ticker)
+        if len(builds) > 1:
+            rebuilt.set()
+        return f"v{len(builds)}", {}
+
+    scheduler = PrecomputeScheduler(build, [("^GSPC", "2y")])
+    scheduler.refresh_all(force=False)
+
+    # pretend the entry predates the last close and nothing was tried recently
+    scheduler._warm[("^GSPC", "2y")]["built_at"] -= timedelta(days=7)
+    scheduler._attempted.clear()
+
+    assert scheduler.get("^GSPC", "2y")["dataset"] == "v1"
+    assert rebuilt.wait(1)
+    assert scheduler.get("^GSPC", "2y")["dataset"] == "v2"
+    assert builds == ["^GSPC", "^GSPC"]
+
+
+def test_failed_rebuild_keeps_serving_and_backs_off(no_network):
+    build = MagicMock(return_value=("v1", {}))
+    scheduler = PrecomputeScheduler(build, [("^GSPC", "2y")])
+    scheduler.refresh_all(force=False)
+
+    build.side_effect = RuntimeError("yahoo down")
+    scheduler._warm[("^GSPC", "2y")]["built_at"] -= timedelta(days=7)
+
+    # the warm-up just attempted this pair, so stale reads don't pile on rebuilds
+    for _ in range(5):
+        assert scheduler.get("^GSPC", "2y")["dataset"] == "v1"
+    assert build.call_count == 1
+
+
+def test_scheduler_thread_starts_and_stops(no_network):
+    build = MagicMock(return_value=("v1", {}))
+    scheduler = PrecomputeScheduler(build, [("^GSPC", "2y")])
+
+    scheduler.start()
+    for _ in range(100):
+        if scheduler.get("^GSPC", "2y") is not None:
+            break
+        threading.Event().wait(0.01)
+    scheduler.stop()
+
+    assert scheduler.get("^GSPC", "2y")["dataset"] == "v1"
+    assert scheduler._thread is None
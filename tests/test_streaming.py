@@ -0,0 +1,59 @@
+import pandas as pd
+import numpy as np
+from app.indicators import add_indicators
+from app.streaming import StreamingIndicators, RollingStats, EWMean
+
+INDICATOR_COLS = [
+    'SMA_50', 'SMA_200', 'RSI_14', 'ATR_14', 'ATR_Z',
+    'MACD', 'MACD_Signal', 'MACD_Hist', 'BB_Upper', 'BB_Lower',
+    'Momentum_10', 'Momentum_Drift', 'Market_Stress', 'Fear_Greed'
+]
+
+def test_streaming_matches_add_indicators(mock_market_data):
+    expected = add_indicators(mock_market_data)
+    streamed = StreamingIndicators().update_frame(mock_market_data)
+
+    for col in INDICATOR_COLS:
+        assert np.allclose(streamed[col], expected[col], equal_nan=True, rtol=1e-8, atol=1e-8), col
+
+def test_streaming_batches_continue_state(mock_market_data):
+    expected = add_indicators(mock_market_data)
+
+    engine = StreamingIndicators()
+    engine.update_frame(mock_market_data.iloc[:250])
+    tail = engine.update_frame(mock_market_data.iloc[250:])
+
+    for col in INDICATOR_COLS:
+        assert np.allclose(tail[col], expected[col].iloc[250:], equal_nan=True, rtol=1e-8, atol=1e-8), col
+
+def test_rolling_stats_matches_pandas():
+    values = pd.Series(np.random.rand(120))
+    stats = RollingStats(20)
+    streamed = np.array([stats.update(v) for v in values])
+
+    rolling = values.rolling(20)
+    assert np.allclose(streamed[:, 0], rolling.mean(), equal_nan=True)
+    assert np.allclose(streamed[:, 1], rolling.std(), equal_nan=True)
+
+def test_ewmean_matches_pandas_with_gaps():
+    values = pd.Series([np.nan, 1.0, 2.0, np.nan, 4.0, 3.0, 5.0, 5.0])
+    ewm = EWMean.from_com(2, min_periods=3)
+    streamed = [ewm.update(v) for v in values]
+
+    assert np.allclose(streamed, values.ewm(com=2, min_periods=3).mean(), equal_nan=True)
+
+def test_rolling_stats_stays_accurate_on_long_streams():
+    rng = np.random.default_rng(3)
+    # a volatile history, then a quiet tail and finally one repeated value
+    values = pd.Series(np.concatenate([
+        1000 + np.cumsum(rng.normal(0, 20, 100_000)),
+        rng.normal(0, 0.001, 200),
+        np.full(60, 0.5),
+    ]))
+    stats = RollingStats(50)
+    streamed = np.array([stats.update(v) for v in values])
+
+    expected = values.rolling(50).std()
+    assert np.allclose(streamed[-250:-60, 1], expected.iloc[-250:-60], rtol=1e-6)
+    assert streamed[-1, 0] == 0.5
+    assert streamed[-1, 1] == 0.0